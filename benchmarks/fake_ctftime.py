@@ -0,0 +1,93 @@
+import asyncio
+import hashlib
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+WORDS = ["Hack", "Pwn", "Crypto", "Flag", "Cyber", "Shell", "Byte", "Root", "Kernel", "Web",
+         "Quals", "Finals", "Open", "Junior", "University", "National", "Winter", "Summer"]
+
+
+def make_events(count: int, seed: int = 1) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    events = []
+    for i in range(count):
+        start = now + timedelta(hours=rng.randint(1, 24 * 45))
+        finish = start + timedelta(hours=rng.choice([24, 36, 48, 72]))
+        title = " ".join(rng.sample(WORDS, 2)) + f" CTF {2025 + i % 2} #{i}"
+        events.append({
+            "id": 1000 + i,
+            "title": title,
+            "url": f"https://ctf{i}.example.org/",
+            "start": start.isoformat(),
+            "finish": finish.isoformat(),
+            "weight": round(rng.uniform(0, 100), 2),
+            "format": rng.choice(["Jeopardy", "Attack-Defense"]),
+            "logo": "",
+            "description": "Benchmark event " * 20,
+        })
+    return sorted(events, key=lambda e: e["start"])
+
+
+# Local stand-in for the CTFtime API with injectable latency and failures
+class FakeCTFtime:
+    def __init__(self, events: int = 100, latency: float = 0.05, failure_rate: float = 0.0, seed: int = 1):
+        self.events = make_events(events, seed)
+        self.by_id = {event["id"]: event for event in self.events}
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.port: Optional[int] = None
+        self._runner: Optional[web.AppRunner] = None
+
+        self.app = web.Application()
+        self.app.router.add_get("/api/v1/events/", self.list_events)
+        self.app.router.add_get("/api/v1/events/{event_id}/", self.event_details)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/api/v1"
+
+    async def _simulate(self) -> Optional[web.Response]:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failure_rate and self.rng.random() < self.failure_rate:
+            return web.Response(status=503)
+        return None
+
+    async def list_events(self, request: web.Request) -> web.Response:
+        failure = await self._simulate()
+        if failure:
+            return failure
+        limit = int(request.query.get("limit", 100))
+        return web.json_response(self.events[:limit])
+
+    async def event_details(self, request: web.Request) -> web.Response:
+        failure = await self._simulate()
+        if failure:
+            return failure
+        event = self.by_id.get(int(request.match_info["event_id"]))
+        if event is None:
+            return web.Response(status=404)
+        body = json.dumps(event)
+        etag = '"' + hashlib.sha1(body.encode()).hexdigest() + '"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=body, content_type="application/json", headers={"ETag": etag})
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
@@ -0,0 +1,153 @@
+import asyncio
+import itertools
+import random
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+import discord
+
+_ids = itertools.count(10 ** 17)
+
+
+def snowflake() -> int:
+    return next(_ids)
+
+
+class FakeUser:
+    def __init__(self, user_id: Optional[int] = None, bot: bool = False):
+        self.id = user_id or snowflake()
+        self.name = f"user{self.id % 100000}"
+        self.display_name = self.name.title()
+        self.bot = bot
+
+    async def send(self, *args, **kwargs):
+        pass
+
+
+class FakeCommand:
+    def __init__(self, name: str):
+        self.qualified_name = name
+
+
+# Records when the interaction was first answered, which is what the user waits for
+class FakeResponse:
+    def __init__(self, interaction: "FakeInteraction"):
+        self.interaction = interaction
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    def _mark(self):
+        if not self._done:
+            self._done = True
+            self.interaction.first_response_at = time.perf_counter()
+
+    async def defer(self, **kwargs):
+        self._mark()
+        self.interaction.deferred = True
+
+    async def send_message(self, content: Any = None, **kwargs):
+        self._mark()
+        self.interaction.messages.append((content, kwargs))
+
+    async def edit_message(self, **kwargs):
+        self._mark()
+
+
+class FakeFollowup:
+    def __init__(self, interaction: "FakeInteraction"):
+        self.interaction = interaction
+
+    async def send(self, content: Any = None, **kwargs):
+        self.interaction.messages.append((content, kwargs))
+        self.interaction.completed_at = time.perf_counter()
+
+
+class FakeInteraction:
+    def __init__(self, command: str = "", user: Optional[FakeUser] = None, guild: Any = None):
+        self.id = snowflake()
+        self.user = user or FakeUser()
+        self.guild = guild
+        self.guild_id = getattr(guild, "id", None)
+        self.channel_id = snowflake()
+        self.command = FakeCommand(command)
+        self.extras: Dict[str, Any] = {}
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+        self.messages: List[Any] = []
+        self.deferred = False
+        self.created = time.perf_counter()
+        self.first_response_at: Optional[float] = None
+        self.completed_at: Optional[float] = None
+
+    async def edit_original_response(self, **kwargs):
+        self.messages.append((kwargs.get("content"), kwargs))
+        self.completed_at = time.perf_counter()
+
+
+class FakeEmoji:
+    def __init__(self, name: str):
+        self.name = name
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class FakeReactionPayload:
+    def __init__(self, guild_id: int, message_id: int, user_id: int, emoji: str = "👍"):
+        self.guild_id = guild_id
+        self.message_id = message_id
+        self.user_id = user_id
+        self.emoji = FakeEmoji(emoji)
+        self.member = None
+
+
+# Role add/remove endpoint with fixed latency and an optional 429 rate
+class FakeHTTP:
+    def __init__(self, latency: float = 0.002, rate_limit_every: int = 0):
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.calls = 0
+
+    async def _call(self):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if self.rate_limit_every and self.calls % self.rate_limit_every == 0:
+            class _Response:
+                status = 429
+                reason = "Too Many Requests"
+
+            error = discord.HTTPException(_Response(), "rate limited")
+            error.retry_after = 0.01
+            raise error
+
+    async def add_role(self, guild_id, user_id, role_id, reason=None):
+        await self._call()
+
+    async def remove_role(self, guild_id, user_id, role_id, reason=None):
+        await self._call()
+
+
+class FakeClient:
+    def __init__(self, http: FakeHTTP):
+        self.http = http
+        self.user = FakeUser(bot=True)
+
+    def get_guild(self, guild_id):
+        return None
+
+
+# A burst of 👍 add/remove events across announcement messages; some users
+# toggle their reaction, which the role queue should coalesce
+def reaction_storm(
+    guild_id: int, message_ids: List[int], users: int, toggle_rate: float = 0.1, seed: int = 1
+) -> Iterator[tuple]:
+    rng = random.Random(seed)
+    user_ids = [snowflake() for _ in range(users)]
+    for user_id in user_ids:
+        message_id = rng.choice(message_ids)
+        yield "add", FakeReactionPayload(guild_id, message_id, user_id)
+        if rng.random() < toggle_rate:
+            yield "remove", FakeReactionPayload(guild_id, message_id, user_id)
+            yield "add", FakeReactionPayload(guild_id, message_id, user_id)
@@ -0,0 +1,237 @@
+# Offline benchmarks for the bot's hot paths. Runs against a local fake CTFtime
+# server and stubbed Discord objects, so no token or network is needed:
+#
+#     python -m benchmarks.run --output benchmarks/results.json
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.fake_ctftime import FakeCTFtime  # noqa: E402
+from benchmarks.fakes import FakeClient, FakeHTTP, FakeInteraction, reaction_storm, snowflake  # noqa: E402
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    ms = [s * 1000 for s in samples]
+    return {
+        "n": len(ms),
+        "p50_ms": round(percentile(ms, 50), 4),
+        "p99_ms": round(percentile(ms, 99), 4),
+        "mean_ms": round(statistics.fmean(ms), 4),
+        "max_ms": round(max(ms), 4),
+    }
+
+
+async def bench_autocomplete(bots, fake: FakeCTFtime, iterations: int) -> Dict[str, Any]:
+    bots.event_index._snapshot = None
+    interaction = FakeInteraction("addctfchannels")
+
+    started = time.perf_counter()
+    await bots.ctf_name_autocomplete(interaction, "")
+    cold = time.perf_counter() - started
+
+    rng = random.Random(2)
+    titles = [event["title"] for event in fake.events]
+    samples = []
+    for _ in range(iterations):
+        title = rng.choice(titles)
+        offset = rng.randrange(0, max(1, len(title) - 4))
+        query = title[offset:offset + rng.randint(1, 8)]
+        started = time.perf_counter()
+        await bots.ctf_name_autocomplete(interaction, query)
+        samples.append(time.perf_counter() - started)
+    return {"cold_ms": round(cold * 1000, 3), "warm": summarize(samples)}
+
+
+async def bench_upcoming(bots, iterations: int) -> Dict[str, Any]:
+    bots.upcoming_feed.snapshot = None
+    started = time.perf_counter()
+    await bots.upcoming.callback(FakeInteraction("upcoming"))
+    cold = time.perf_counter() - started
+
+    samples = []
+    for _ in range(iterations):
+        interaction = FakeInteraction("upcoming")
+        started = time.perf_counter()
+        await bots.upcoming.callback(interaction)
+        samples.append(time.perf_counter() - started)
+    return {"cold_ms": round(cold * 1000, 3), "warm": summarize(samples)}
+
+
+async def bench_moreinfo(bots, fake: FakeCTFtime, iterations: int) -> Dict[str, Any]:
+    ids = [event["id"] for event in fake.events]
+    bots.event_cache._entries.clear()
+    cold = []
+    for event_id in ids[:min(iterations, len(ids))]:
+        started = time.perf_counter()
+        await bots.moreinfo.callback(FakeInteraction("moreinfo"), event_id)
+        cold.append(time.perf_counter() - started)
+
+    rng = random.Random(3)
+    warm = []
+    for _ in range(iterations):
+        event_id = rng.choice(ids[:len(cold)])
+        started = time.perf_counter()
+        await bots.moreinfo.callback(FakeInteraction("moreinfo"), event_id)
+        warm.append(time.perf_counter() - started)
+    return {"cold": summarize(cold), "warm": summarize(warm)}
+
+
+async def bench_reactions(bots, users: int, http_latency: float, rate_limit_every: int) -> Dict[str, Any]:
+    from registry import AnnouncementRecord
+    from roles import RoleGrantQueue
+
+    guild_id = snowflake()
+    message_ids = []
+    for _ in range(5):
+        record = AnnouncementRecord(snowflake(), snowflake(), snowflake(), "bench")
+        bots.channel_messages.add(record)
+        message_ids.append(record.message_id)
+
+    http = FakeHTTP(latency=http_latency, rate_limit_every=rate_limit_every)
+    queue = RoleGrantQueue(FakeClient(http))
+    bots.role_grants = queue
+    queue.start()
+
+    events = list(reaction_storm(guild_id, message_ids, users))
+    started = time.perf_counter()
+    for kind, payload in events:
+        if kind == "add":
+            await bots.on_raw_reaction_add(payload)
+        else:
+            await bots.on_raw_reaction_remove(payload)
+    dispatched = time.perf_counter() - started
+
+    while len(queue):
+        await asyncio.sleep(0.001)
+    await asyncio.sleep(http_latency * 2)
+    elapsed = time.perf_counter() - started
+    queue.stop()
+
+    for message_id in message_ids:
+        bots.channel_messages.remove(message_id)
+    return {
+        "events": len(events),
+        "rest_calls": http.calls,
+        "dispatch_ms": round(dispatched * 1000, 3),
+        "drain_seconds": round(elapsed, 4),
+        "events_per_second": round(len(events) / elapsed, 1),
+    }
+
+
+async def bench_persistence(directory: str, sizes: List[int], writes: int) -> Dict[str, Any]:
+    from registry import AnnouncementRecord
+    from storage import JSONStorage, SQLiteStorage
+
+    results: Dict[str, Any] = {}
+    for backend in ("sqlite", "json"):
+        path = os.path.join(directory, f"persist-{backend}")
+        os.makedirs(path, exist_ok=True)
+        storage = SQLiteStorage(os.path.join(path, "bot.db")) if backend == "sqlite" else JSONStorage(path)
+        rows = []
+        existing = 0
+        for size in sizes:
+            # Grow the store to `size` records, then time single-record writes
+            await storage.batch([
+                ("put", "votes", str(i), {"poll_id": i, "votesyes": 0, "votesno": 0, "participants": []})
+                for i in range(existing, size)
+            ])
+            await storage.upsert_announcements(
+                AnnouncementRecord(i + 1, i + 1, i + 1, f"ctf{i}") for i in range(existing, size)
+            )
+            existing = size
+
+            vote_samples, announcement_samples = [], []
+            for i in range(writes):
+                started = time.perf_counter()
+                await storage.save_vote(i, {"poll_id": i, "votesyes": i, "votesno": 0, "participants": []})
+                vote_samples.append(time.perf_counter() - started)
+                started = time.perf_counter()
+                await storage.upsert_announcements([AnnouncementRecord(i + 1, i + 1, i + 1, "updated")])
+                announcement_samples.append(time.perf_counter() - started)
+            rows.append({
+                "records": size,
+                "vote_upsert": summarize(vote_samples),
+                "announcement_upsert": summarize(announcement_samples),
+                "writes_per_second": round(writes / sum(vote_samples), 1),
+            })
+        await storage.close()
+        results[backend] = rows
+    return results
+
+
+async def main(args) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="ctfbot-bench-")
+    os.chdir(workdir)
+    os.environ["STORAGE_PATH"] = os.path.join(workdir, "bot.db")
+    os.environ.setdefault("STORAGE_BACKEND", "sqlite")
+
+    import bots  # Imported after the storage paths point at the scratch directory
+
+    fake = FakeCTFtime(events=args.events, latency=args.latency, failure_rate=args.failure_rate)
+    await fake.start()
+    bots.ctftime.base_url = fake.base_url
+    bots.ctftime.backoff = 0.01
+    try:
+        results = {
+            "autocomplete": await bench_autocomplete(bots, fake, args.iterations),
+            "upcoming": await bench_upcoming(bots, args.iterations),
+            "moreinfo": await bench_moreinfo(bots, fake, args.iterations),
+            "reaction_roles": await bench_reactions(bots, args.users, args.http_latency, args.rate_limit_every),
+            "persistence": await bench_persistence(workdir, args.sizes, args.writes),
+            "ctftime_requests": fake.requests,
+        }
+    finally:
+        await bots.event_cache.close()
+        await bots.ctftime.close()
+        await bots.storage.close()
+        await fake.stop()
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the CTF bot")
+    parser.add_argument("--output", default=os.path.join(ROOT, "benchmarks", "results.json"))
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--events", type=int, default=100, help="events served by the fake CTFtime")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake CTFtime latency in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of CTFtime requests that 503")
+    parser.add_argument("--users", type=int, default=500, help="users in the reaction storm")
+    parser.add_argument("--http-latency", type=float, default=0.002, help="fake Discord REST latency")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="return a 429 every N role calls")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--writes", type=int, default=50, help="timed writes per store size")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = asyncio.run(main(args))
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(json.dumps(report["results"], indent=2))
+    print(f"Results written to {args.output}")
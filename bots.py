@@ -1,250 +1,305 @@
-import requests
-import json
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 import discord
 from discord import app_commands
-import pytz
-import aiohttp
 from dateutil.relativedelta import relativedelta
-from bs4 import BeautifulSoup
 import asyncio
+import hashlib
+import json
 import os
-import random
 import logging
-from typing import List, Dict, Optional  # Import typing modules for compatibility
-
-# Initialize logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+import math
+from typing import List, Dict, Optional, Union  # Import typing modules for compatibility
+
+from bulk import BulkOperation, archive_channel, select_channels
+from calendar_feed import CalendarFeed
+from ctftime import CTFTimeClient, CTFTimeError, parse_ctftime
+from event_cache import EventCache
+from event_index import EventIndex
+from guild_config import GuildConfig, GuildConfigStore
+from keep_alive import HealthServer
+from logs import setup_logging
+import metrics
+from polls import NO, YES, PollEngine
+from participants import ParticipantPager, reaction_participants, role_participants
+from provisioning import get_or_create_category, provision_ctf
+from reconcile import Reconciler
+from registry import AnnouncementRecord, ChannelRegistry
+from roles import RoleGrantQueue
+from scheduler import Scheduler
+from storage import get_storage, open_storage
+from team_tracker import TeamTracker
+from throttle import RateLimited, SingleFlight, rate_limit
+from upcoming import UpcomingFeed
+
+# Initialize logging (JSON lines written from a background thread; LOG_FORMAT=text for plain lines)
+log_listener = setup_logging(logging.INFO)
 
 # Initialize Discord client and intents
 intents = discord.Intents.default()
 intents.message_content = True
 intents.reactions = True
 intents.members = True
-client = discord.Client(intents=intents)
-tree = app_commands.CommandTree(client)
+ctftime = CTFTimeClient()
+event_cache = EventCache(ctftime)
+event_index = EventIndex(ctftime, cache=event_cache)
+upcoming_feed = UpcomingFeed(ctftime)
+
+# SHARDED=1 lets one deployment serve many servers; discord.py picks the shard
+# count from the gateway unless SHARD_COUNT overrides it
+BaseClient = discord.AutoShardedClient if os.environ.get("SHARDED") else discord.Client
+shard_count = os.environ.get("SHARD_COUNT")
+
+
+class CTFBot(BaseClient):
+    # Runs once per process, before the gateway connects; reconnects don't repeat it
+    async def setup_hook(self):
+        await health.start()  # Health, readiness and /metrics on the bot's own loop
+        await startup()
+
+    async def close(self):
+        await health.stop()
+        event_index.close()
+        upcoming_feed.stop()
+        role_grants.stop()
+        scheduler.stop()
+        await polls.stop()
+        team_tracker.stop()
+        await event_cache.close()
+        await ctftime.close()
+        await storage.close()
+        await super().close()
+
+
+# Command tree that times every slash command for the metrics endpoint
+class InstrumentedTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        metrics.command_started(interaction)
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        if isinstance(error, RateLimited):
+            metrics.command_rate_limited(interaction, error.scope)
+            await interaction.response.send_message(
+                f"⏳ Slow down! Try again in {math.ceil(error.retry_after)}s.", ephemeral=True
+            )
+            return
+        # Logged here rather than by discord.py, so the record keeps the command fields
+        metrics.command_error(interaction, getattr(error, "original", error), "raised")
+        metrics.command_finished(interaction, failed=True)
+
+
+client = CTFBot(intents=intents, shard_count=int(shard_count) if shard_count else None)
+tree = InstrumentedTree(client)
+metrics.install(client)
+health = HealthServer(client)
+health.add_cache("event_index", lambda: event_index.fetched_at, max_age=event_index.ttl * 2)
+health.add_cache(
+    "upcoming",
+    lambda: upcoming_feed.snapshot.fetched_at if upcoming_feed.snapshot else None,
+    max_age=upcoming_feed.interval * 2,
+)
+role_grants = RoleGrantQueue(client)
+announcement_fetches = SingleFlight("announcement_fetch")
 
 # Constants
 whitelist = [861158345842884638, 712179834700431440, 277479464621965313, 
              521724336499851267, 372975036669362188, 691010113535869028, 373372334603501578]
 ANNOUNCEMENT_CHANNELS = [1318209002097610857]
-channel_messages: Dict[int, Dict[str, int]] = {}
-file_lock = asyncio.Lock()
-
-# Ensure votes.json exists
-def initialize_votes_file():
+# Seconds late a /createevent start or end notice may still be posted after a restart
+EVENT_NOTICE_GRACE = 15 * 60
+channel_messages = ChannelRegistry()
+storage = get_storage()
+# Jobs wait for the gateway cache, or overdue ones would find no channel to post to
+scheduler = Scheduler(storage, ready=client.wait_until_ready)
+# Subscribable .ics of upcoming CTFs (plus a guild's /createevent events), served by the health server
+calendar = CalendarFeed(event_index, storage, has_guild=lambda guild_id: client.get_guild(guild_id) is not None)
+health.add_route("/calendar.ics", calendar.handle)
+health.add_route("/calendar/{token:[A-Za-z0-9_-]+}.ics", calendar.handle)
+polls = PollEngine(storage)
+
+# Post a tracked team's CTFtime changes to one of the channels following it.
+# A channel missing from the ready cache is gone, so there is nothing to retry.
+async def _post_team_update(channel_id: int, message: str) -> bool:
+    channel = client.get_channel(channel_id)
+    if channel is None:
+        logging.warning(f"Team update channel {channel_id} not found")
+        return client.is_ready()
+    try:
+        await channel.send(message)
+        return True
+    except discord.HTTPException as e:
+        logging.error(f"Error posting team update to {channel_id}: {str(e)}")
+        return False
+
+team_tracker = TeamTracker(ctftime, storage, _post_team_update, ready=client.wait_until_ready)
+# Per-guild settings. The values above apply only to the home guild (the one
+# holding ANNOUNCEMENT_CHANNELS); other guilds start with nobody authorized.
+guild_configs = GuildConfigStore(storage, GuildConfig(0, whitelist, announcement_channels=ANNOUNCEMENT_CHANNELS))
+
+# Persist new or changed channel_messages records
+async def save_channel_messages(records: List[AnnouncementRecord]):
     try:
-        if not os.path.exists('votes.json'):
-            with open('votes.json', 'w') as f:
-                json.dump({}, f)
+        await storage.upsert_announcements(records)
     except Exception as e:
-        logging.error(f"Error initializing votes file: {str(e)}")
+        logging.error(f"Error saving channel messages: {str(e)}")
 
-# Helper function to safely load votes
-async def load_votes() -> Dict:
-    async with file_lock:
-        try:
-            with open("votes.json", "r") as file:
-                return json.load(file)
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            logging.error(f"Error loading votes: {str(e)}")
-            return {}
-
-# Helper function to safely save votes
-async def save_votes(votes: Dict):
-    async with file_lock:
-        try:
-            with open("votes.json", "w") as file:
-                json.dump(votes, file, indent=4)
-        except Exception as e:
-            logging.error(f"Error saving votes: {str(e)}")
-
-# Save channel_messages to a file
-async def save_channel_messages():
-    async with file_lock:
-        try:
-            with open("channel_messages.json", "w") as file:
-                json.dump(channel_messages, file, indent=4)
-        except Exception as e:
-            logging.error(f"Error saving channel messages: {str(e)}")
-
-# Load channel_messages from a file
-async def load_channel_messages() -> Dict[int, Dict[str, int]]:
-    async with file_lock:
-        try:
-            with open("channel_messages.json", "r") as file:
-                return json.load(file)
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            logging.error(f"Error loading channel messages: {str(e)}")
-            return {}
+# Load channel_messages from storage
+async def load_channel_messages() -> ChannelRegistry:
+    try:
+        return await storage.load_announcements()
+    except Exception as e:
+        logging.error(f"Error loading channel messages: {str(e)}")
+        return ChannelRegistry()
 
 # Autocomplete function for CTF names
 async def ctf_name_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_11_5) AppleWebKit/537.36"
-            "(KHTML, like Gecko) Chrome/50.0.2661.102 Safari/537.36"
-        }
-
-        now = datetime.utcnow().timestamp()
-        twenty_five_days = datetime.utcnow() + relativedelta(days=+50)
-        twenty_five_days = twenty_five_days.timestamp()
-
-        r = requests.get(
-            "https://ctftime.org/api/v1/events/?limit=100"
-            + "&start="
-            + str(int(now))
-            + "&finish="
-            + str(int(twenty_five_days)),
-            headers=headers,
-        )
-        r.raise_for_status()
-        data = r.json()
-
-        # Filter CTF names based on user input
-        ctf_names = [event["title"] for event in data if current.lower() in event["title"].lower()]
-        return [app_commands.Choice(name=name, value=name) for name in ctf_names[:25]]  # Limit to 25 choices
+        # Answered from the cached event index; a stale index is refreshed in the background
+        with metrics.autocomplete_latency.time(command="addctfchannels"):
+            ctf_names = await event_index.search(current, limit=25)  # Limit to 25 choices
+        return [app_commands.Choice(name=name, value=name) for name in ctf_names]
 
     except Exception as e:
         logging.error(f"Error fetching CTF names: {str(e)}")
         return []  # Return an empty list on error
 
+# Whether the invoking user may run the CTF management commands in this guild
+def _authorized(interaction: discord.Interaction) -> bool:
+    return guild_configs.get(interaction.guild_id).is_authorized(interaction.user)
+
+# The guild's configured announcement channels that the bot can see
+def _announcement_channels(guild: discord.Guild) -> List[discord.abc.Messageable]:
+    channels = map(guild.get_channel, guild_configs.get(guild.id).announcement_channels)
+    return [channel for channel in channels if channel]
+
+# Check that both the user and the bot can manage channels and roles
+async def _check_provisioning_permissions(interaction: discord.Interaction) -> bool:
+    # Check if the user has manage_channels and manage_roles permissions
+    if not interaction.user.guild_permissions.manage_channels or not interaction.user.guild_permissions.manage_roles:
+        await interaction.response.send_message(
+            "❌ You don't have permission to manage channels or roles!", ephemeral=True
+        )
+        return False
+
+    # Check if the bot has manage_channels and manage_roles permissions
+    if not interaction.guild.me.guild_permissions.manage_channels or not interaction.guild.me.guild_permissions.manage_roles:
+        await interaction.response.send_message(
+            "❌ I don't have permission to manage channels or roles!", ephemeral=True
+        )
+        return False
+    return True
+
 # Define the command with autocomplete
 @tree.command(name="addctfchannels", description="Add a CTF channel by name")
 @app_commands.autocomplete(ctf_name=ctf_name_autocomplete)
 async def add_ctf_channels(interaction: discord.Interaction, ctf_name: str):
-    if interaction.user.id in whitelist:
-        try:
-            # Check if the user has manage_channels and manage_roles permissions
-            if not interaction.user.guild_permissions.manage_channels or not interaction.user.guild_permissions.manage_roles:
-                await interaction.response.send_message(
-                    "❌ You don't have permission to manage channels or roles!", ephemeral=True
-                )
-                return
-
-            # Check if the bot has manage_channels and manage_roles permissions
-            if not interaction.guild.me.guild_permissions.manage_channels or not interaction.guild.me.guild_permissions.manage_roles:
-                await interaction.response.send_message(
-                    "❌ I don't have permission to manage channels or roles!", ephemeral=True
-                )
-                return
+    if _authorized(interaction):
+        if not await _check_provisioning_permissions(interaction):
+            return
 
-            # Create or get the CTF category
-            ctf_category = discord.utils.get(interaction.guild.categories, name="CTF Competition") or await interaction.guild.create_category("CTF Competition")
-            
-            # Create a role for the CTF channel
-            ctf_role = discord.utils.get(interaction.guild.roles, name=f"CTF-{ctf_name}") or await interaction.guild.create_role(name=f"CTF-{ctf_name}")
-
-            # Set up channel permissions
-            overwrites = {
-                interaction.guild.default_role: discord.PermissionOverwrite(read_messages=False),
-                ctf_role: discord.PermissionOverwrite(read_messages=True),
-                interaction.guild.me: discord.PermissionOverwrite(read_messages=True)
-            }
-            
-            # Create the CTF channel
-            channel = await interaction.guild.create_text_channel(
+        # Defer before any REST call so the interaction deadline can't be missed
+        await metrics.defer(interaction, ephemeral=True, thinking=True)
+        try:
+            await provision_ctf(
+                interaction.guild,
                 ctf_name,
-                category=ctf_category,
-                overwrites=overwrites
+                _announcement_channels(interaction.guild),
+                channel_messages,
+                storage,
+                user=interaction.user,
+                progress=lambda message: interaction.edit_original_response(content=message),
+                category_name=guild_configs.get(interaction.guild_id).ctf_category,
             )
-            
-            # Send announcement messages
-            for announcement_id in ANNOUNCEMENT_CHANNELS:
-                announcement_channel = client.get_channel(announcement_id)
-                if announcement_channel:
-                    announce_msg = await announcement_channel.send(
-                        f"""🏁 New CTF: **{ctf_name}** is now available!
-React with 👍 to gain access."""
+            await interaction.edit_original_response(content=f"✅ Created channel for **{ctf_name}**")
+        except Exception as e:
+            metrics.command_error(interaction, e)
+            await interaction.edit_original_response(content=f"❌ Error: {str(e)}")
+    else:
+        await interaction.response.send_message("❌ Not authorized", ephemeral=True)
+
+@tree.command(name="addctfbatch", description="Add channels for several CTFs at once (comma-separated names)")
+async def add_ctf_batch(interaction: discord.Interaction, ctf_names: str):
+    if _authorized(interaction):
+        names = list(dict.fromkeys(name.strip() for name in ctf_names.split(",") if name.strip()))
+        if not names:
+            await interaction.response.send_message("❌ No CTF names given.", ephemeral=True)
+            return
+        if not await _check_provisioning_permissions(interaction):
+            return
+
+        await metrics.defer(interaction, ephemeral=True, thinking=True)
+        status = {name: "⏳ queued" for name in names}
+
+        async def show_status():
+            lines = [f"**{name}**: {state}" for name, state in status.items()]
+            await interaction.edit_original_response(content="\n".join(lines))
+
+        try:
+            # Resolve the shared category once so parallel runs don't each create one
+            category_name = guild_configs.get(interaction.guild_id).ctf_category
+            category, _ = await get_or_create_category(interaction.guild, category_name)
+        except Exception as e:
+            metrics.command_error(interaction, e)
+            await interaction.edit_original_response(content=f"❌ Error: {str(e)}")
+            return
+
+        announcement_channels = _announcement_channels(interaction.guild)
+        limit = asyncio.Semaphore(3)
+
+        async def provision(name: str):
+            async with limit:
+                try:
+                    await provision_ctf(
+                        interaction.guild, name, announcement_channels, channel_messages, storage,
+                        category=category,
                     )
-                    await announce_msg.add_reaction("👍")
-                    channel_messages[announce_msg.id] = {'channel_id': channel.id, 'role_id': ctf_role.id}
-            
-            await save_channel_messages()  # Persist channel_messages
-            
-            # Send DM to user about channel creation
+                    status[name] = "✅ created"
+                except Exception as e:
+                    metrics.command_error(interaction, e, f"failed for {name}")
+                    status[name] = f"❌ {str(e)}"
+                try:
+                    await show_status()
+                except discord.HTTPException as e:
+                    logging.error(f"Error reporting batch progress: {str(e)}", extra=metrics.command_fields(interaction))
+
+        await asyncio.gather(*(provision(name) for name in names))
+        await show_status()
+
+        created = [name for name, state in status.items() if state.startswith("✅")]
+        if created:
             try:
-                await interaction.user.send(f"✅ New channel created: **{ctf_name}**")
+                await interaction.user.send("✅ New channels created: " + ", ".join(f"**{n}**" for n in created))
             except discord.Forbidden:
                 pass  # Unable to DM user
-                
-            await interaction.response.send_message(f"✅ Created channel for **{ctf_name}**", ephemeral=True)
-            
-        except Exception as e:
-            await interaction.response.send_message(f"❌ Error: {str(e)}", ephemeral=True)
     else:
         await interaction.response.send_message("❌ Not authorized", ephemeral=True)
 
-async def fetch_upcoming_events():
-    start = int(datetime.now().timestamp())
-    end = int((datetime.now() + timedelta(weeks=4)).timestamp())
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_11_5) AppleWebKit/537.36"
-                      "(KHTML, like Gecko) Chrome/50.0.2661.102 Safari/537.36"
-    }
-    async with aiohttp.ClientSession() as session:
-        async with session.get(
-            f'https://ctftime.org/api/v1/events/?limit=5&start={start}&finish={end}',
-            headers=headers
-        ) as response:
-            return await response.json() if response.status == 200 else None
-
 @tree.command(name="upcoming", description="Get the upcoming CTF events in the next 2 weeks.")
+@rate_limit(user=(3, 30), guild=(10, 30))
 async def upcoming(interaction: discord.Interaction):
     try:
-        await interaction.response.defer()
-        
-        # Fetch up to 10 events
-        start = int(datetime.now().timestamp())
-        end = int((datetime.now() + timedelta(weeks=4)).timestamp())
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_11_5) AppleWebKit/537.36"
-                         "(KHTML, like Gecko) Chrome/50.0.2661.102 Safari/537.36"
-        }
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f'https://ctftime.org/api/v1/events/?limit=10&start={start}&finish={end}',
-                headers=headers
-            ) as response:
-                events = await response.json() if response.status == 200 else None
-
-        if not events:
-            await interaction.followup.send("No upcoming CTF events found.")
+        # Served from the prefetched snapshot; only a cold start waits on CTFtime
+        if upcoming_feed.snapshot is None:
+            await metrics.defer(interaction)
+        snapshot = await upcoming_feed.get()
+
+        if not snapshot.embeds:
+            message = "No upcoming CTF events found."
+            if interaction.response.is_done():
+                await interaction.followup.send(message)
+            else:
+                await interaction.response.send_message(message)
             return
 
-        embeds = []
-        for event in events:
-            start_time = datetime.strptime(event['start'], "%Y-%m-%dT%H:%M:%S%z")
-            end_time = datetime.strptime(event['finish'], "%Y-%m-%dT%H:%M:%S%z")
-            duration = end_time - start_time
-            duration_str = f"{duration.days}d {duration.seconds//3600}h"
-            
-            embed = discord.Embed(
-                title=event['title'],
-                color=random.randint(0, 0xFFFFFF)
-            )
-            
-            description = (
-                f"**Event ID:** {event['id']}\n"
-                f"**Weight:** {event['weight']}\n"
-                f"**Duration:** {duration_str}\n"
-                f"**Start Time:** {start_time.strftime('%Y-%m-%d %H:%M:%S')} UTC\n"
-                f"**End Time:** {end_time.strftime('%Y-%m-%d %H:%M:%S')} UTC\n"
-                f"**Format:** {event['format']}\n"
-                f"**[More Info]({event['url']})**"
-            )
-            embed.description = description
-            
-            if event.get('logo'):
-                embed.set_thumbnail(url=event['logo'])
-                
-            embeds.append(embed)
-            
-        await interaction.followup.send(embeds=embeds)
-
-    except requests.RequestException as e:
+        if interaction.response.is_done():
+            await interaction.followup.send(embeds=snapshot.build_embeds())
+        else:
+            await interaction.response.send_message(embeds=snapshot.build_embeds())
+
+    except CTFTimeError as e:
         await interaction.followup.send(f"❌ Error fetching CTF events: {str(e)}")
     except Exception as e:
+        metrics.command_error(interaction, e)
         await interaction.followup.send(f"❌ An unexpected error occurred: {str(e)}")
 
 
@@ -252,16 +307,10 @@ async def upcoming(interaction: discord.Interaction):
     name="moreinfo",
     description="Get more information about a specific CTF by CTF Time ID",
 )
+@rate_limit(user=(5, 30), guild=(20, 30))
 async def moreinfo(interaction: discord.Interaction, eventid: int):
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_11_5) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/50.0.2661.102 Safari/537.36"
-        }
-        r = requests.get(
-            "https://ctftime.org/api/v1/events/" + str(eventid) + "/", headers=headers
-        )
-        r.raise_for_status()
-        data = r.json()
+        data = await event_cache.get(eventid)
 
         event_title = data["title"]
         event_url = data["url"]
@@ -270,10 +319,10 @@ async def moreinfo(interaction: discord.Interaction, eventid: int):
         event_description = data["description"]
         event_image = data["logo"]
 
-        event_start = datetime.strptime(event_start, "%Y-%m-%dT%H:%M:%S%z")
+        event_start = parse_ctftime(event_start)
         event_start = event_start.timestamp()
 
-        event_end = datetime.strptime(event_end, "%Y-%m-%dT%H:%M:%S%z")
+        event_end = parse_ctftime(event_end)
         event_end = event_end.timestamp()
 
         embed = discord.Embed(
@@ -294,8 +343,8 @@ async def moreinfo(interaction: discord.Interaction, eventid: int):
         embed.add_field(name="When?", value="<t:" + str(int(event_start)) + ":R>", inline=False)
 
         await interaction.response.send_message(embed=embed)
-    except requests.HTTPError as e:
-        if e.response.status_code == 404:
+    except CTFTimeError as e:
+        if e.status == 404:
             await interaction.response.send_message(
                 f"❌ CTF with ID {eventid} not found.", ephemeral=True
             )
@@ -304,6 +353,7 @@ async def moreinfo(interaction: discord.Interaction, eventid: int):
                 f"❌ Error fetching CTF info: {str(e)}", ephemeral=True
             )
     except Exception as e:
+        metrics.command_error(interaction, e)
         await interaction.response.send_message(
             f"❌ An unexpected error occurred: {str(e)}", ephemeral=True
         )
@@ -312,83 +362,95 @@ async def moreinfo(interaction: discord.Interaction, eventid: int):
     name="ctfparticipants",
     description="Get a list of people participating in a CTF event.",
 )
+@rate_limit(user=(2, 30), guild=(6, 30))
 async def ctfparticipants(interaction: discord.Interaction, channel: discord.TextChannel):
     try:
-        # Find the announcement message associated with the CTF channel
-        announcement_message_id = None
-        for msg_id, data in channel_messages.items():
-            if data['channel_id'] == channel.id:
-                announcement_message_id = msg_id
-                break
-
-        if not announcement_message_id:
+        records = channel_messages.by_channel(channel.id)
+
+        # Fast path: members of the CTF role, straight from the member cache
+        role = interaction.guild.get_role(records[0].role_id) if records else None
+        role = role or discord.utils.get(interaction.guild.roles, name=f"CTF-{channel.name}")
+        if role is not None and role.members:
+            total = sum(1 for member in role.members if not member.bot)
+            pager = ParticipantPager(channel.name, role_participants(role), total=total)
+            if await pager.prepare():
+                await interaction.response.send_message(pager.render(), view=pager, ephemeral=True)
+                return
+
+        # Fallback: read the 👍 reactions on the announcement message
+        if not records:
             await interaction.response.send_message(
                 f"No announcement message found for **{channel.name}**.", ephemeral=True
             )
             return
 
-        # Fetch the announcement message
-        announcement_channel = None
-        for channel_id in ANNOUNCEMENT_CHANNELS:
+        await metrics.defer(interaction, ephemeral=True, thinking=True)
+        announcement_message = None
+        # Try the channel the announcement was posted in first, when it was recorded
+        candidates = [records[0].announcement_channel_id] if records[0].announcement_channel_id else []
+        candidates += guild_configs.get(interaction.guild_id).announcement_channels
+        for channel_id in candidates:
             announcement_channel = client.get_channel(channel_id)
             if announcement_channel:
                 try:
-                    announcement_message = await announcement_channel.fetch_message(announcement_message_id)
+                    # Concurrent lookups of the same announcement share one REST call
+                    announcement_message = await announcement_fetches.do(
+                        (channel_id, records[0].message_id),
+                        lambda c=announcement_channel: c.fetch_message(records[0].message_id),
+                    )
                     break
                 except discord.NotFound:
                     continue
 
         if not announcement_message:
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 f"Announcement message for **{channel.name}** not found.", ephemeral=True
             )
             return
 
-        # Get users who reacted with 👍
-        participants = []
-        for reaction in announcement_message.reactions:
-            if str(reaction.emoji) == "👍":
-                async for user in reaction.users():
-                    if not user.bot:  # Exclude the bot itself
-                        participants.append({
-                            "id": user.id,
-                            "username": user.name,
-                            "displayname": user.display_name
-                        })
-                break  # We only care about the 👍 reaction
-
-        if not participants:
-            await interaction.response.send_message(
+        pager = ParticipantPager(channel.name, reaction_participants(announcement_message))
+        if not await pager.prepare():
+            await interaction.followup.send(
                 f"No participants found for **{channel.name}**.", ephemeral=True
             )
             return
 
-        # Format the list of participants
-        message = (
-            f"> # **{channel.name}**\n"
-            f"> ## Participants:\n"
-        )
-        for participant in participants:
-            message += (
-                f"> **{participant['displayname']}** ({participant['username']})\n"
-            )
-
-        await interaction.response.send_message(message, ephemeral=True)
+        await interaction.followup.send(pager.render(), view=pager, ephemeral=True)
 
     except Exception as e:
-        await interaction.response.send_message(
-            f"❌ Error retrieving participants: {str(e)}", ephemeral=True
-        )
+        metrics.command_error(interaction, e)
+        message = f"❌ Error retrieving participants: {str(e)}"
+        if interaction.response.is_done():
+            await interaction.followup.send(message, ephemeral=True)
+        else:
+            await interaction.response.send_message(message, ephemeral=True)
 
 @tree.command(name="createevent", description="Create an event with a name, start time, duration, and CTF code.")
+@app_commands.describe(
+    channel="CTF channel to archive automatically when the event ends",
+    ctftime_id="CTFtime event id; its finish time is used for the automatic archive",
+)
 async def createevent(
     interaction: discord.Interaction,
     event_name: str,
     start_in_hours: int,
     duration_hours: int,
     ctf_code: str,
+    channel: Optional[discord.TextChannel] = None,
+    ctftime_id: Optional[int] = None,
 ):
     try:
+        # Scheduling an archive moves a channel, so it needs the same rights as /archivectf
+        if channel is not None:
+            if not _authorized(interaction):
+                await interaction.response.send_message("❌ Not authorized", ephemeral=True)
+                return
+            if not channel_messages.by_channel(channel.id):
+                await interaction.response.send_message(
+                    f"❌ {channel.mention} isn't a CTF channel.", ephemeral=True
+                )
+                return
+
         # Validate start_in_hours and duration_hours
         if start_in_hours < 0 or duration_hours < 0:
             await interaction.response.send_message(
@@ -399,15 +461,48 @@ async def createevent(
         # Calculate the start time
         start_time = datetime.utcnow() + relativedelta(hours=+start_in_hours)
         end_time = start_time + relativedelta(hours=+duration_hours)
+        start_ts = int(start_time.replace(tzinfo=timezone.utc).timestamp())
+        end_ts = int(end_time.replace(tzinfo=timezone.utc).timestamp())
+
+        # The linked channel is archived when the CTF itself finishes on CTFtime
+        archive_ts = end_ts
+        if ctftime_id is not None:
+            ctf_event = event_cache.peek(ctftime_id)
+            if ctf_event is None:
+                await metrics.defer(interaction)
+                ctf_event = await event_cache.get(ctftime_id)
+            archive_ts = int(parse_ctftime(ctf_event["finish"]).timestamp())
 
         # Format the event details
         event_details = (
             f"**Event Name:** {event_name}\n"
             f"**CTF Code:** {ctf_code}\n"
-            f"**Start Time:** <t:{int(start_time.timestamp())}:f>\n"
-            f"**End Time:** <t:{int(end_time.timestamp())}:f>\n"
+            f"**Start Time:** <t:{start_ts}:f>\n"
+            f"**End Time:** <t:{end_ts}:f>\n"
             f"**Duration:** {duration_hours} hours"
         )
+        if channel is not None:
+            event_details += f"\n**Archives:** {channel.mention} <t:{archive_ts}:R>"
+
+        # Persist the event and schedule its reminders
+        event_id = str(interaction.id)
+        event = {
+            "id": event_id,
+            "event_name": event_name,
+            "ctf_code": ctf_code,
+            "start": start_ts,
+            "end": end_ts,
+            "guild_id": interaction.guild_id,
+            "notify_channel_id": interaction.channel_id,
+            "channel_id": channel.id if channel else None,
+            "ctftime_id": ctftime_id,
+        }
+        await storage.put("events", event_id, event)
+        calendar.add_event(event)
+        await scheduler.schedule(f"{event_id}:start", "event_start", start_ts, event)
+        await scheduler.schedule(f"{event_id}:end", "event_end", end_ts, event)
+        if channel is not None:
+            await scheduler.schedule(f"{event_id}:archive", "event_archive", archive_ts, event)
 
         # Create an embed for the event
         embed = discord.Embed(
@@ -417,37 +512,122 @@ async def createevent(
         )
 
         # Send the embed as a response
-        await interaction.response.send_message(embed=embed)
+        if interaction.response.is_done():
+            await interaction.followup.send(embed=embed)
+        else:
+            await interaction.response.send_message(embed=embed)
 
     except Exception as e:
-        await interaction.response.send_message(
-            f"❌ An error occurred while creating the event: {str(e)}", ephemeral=True
-        )
+        metrics.command_error(interaction, e)
+        message = f"❌ An error occurred while creating the event: {str(e)}"
+        if interaction.response.is_done():
+            await interaction.followup.send(message, ephemeral=True)
+        else:
+            await interaction.response.send_message(message, ephemeral=True)
+
+# Scheduled job handlers for /createevent
+async def _event_notice(event: Dict, text: str):
+    channel = client.get_channel(event["notify_channel_id"])
+    if channel:
+        await channel.send(text)
+
+async def on_event_start(event: Dict):
+    await _event_notice(event, f"🚩 **{event['event_name']}** has started! CTF Code: `{event['ctf_code']}`")
+
+async def on_event_end(event: Dict):
+    await _event_notice(event, f"🏁 **{event['event_name']}** has ended.")
+
+async def on_event_archive(event: Dict):
+    channel = client.get_channel(event["channel_id"])
+    # Re-checked at fire time: only channels still registered as CTF channels are archived
+    if channel and channel_messages.by_channel(channel.id):
+        await archive_channel(channel, guild_configs.get(channel.guild.id).archive_category)
+        await _event_notice(event, f"📦 Archived {channel.name}")
+
+# Start/end notices that fell due during a long outage are stale; archives still run
+scheduler.register("event_start", on_event_start, expire_after=EVENT_NOTICE_GRACE)
+scheduler.register("event_end", on_event_end, expire_after=EVENT_NOTICE_GRACE)
+scheduler.register("event_archive", on_event_archive)
 
 @tree.command(name="archivectf", description="Archive a CTF channel.")
 async def archivectf(interaction: discord.Interaction, channel: discord.TextChannel):
-    if interaction.user.id in whitelist:
+    if _authorized(interaction):
         try:
-            archive_category = discord.utils.get(interaction.guild.categories, name="Archived CTFs")
-            if not archive_category:
-                try:
-                    archive_category = await interaction.guild.create_category("Archived CTFs")
-                except discord.Forbidden:
-                    await interaction.response.send_message(
-                        "❌ I don't have permission to create categories!", ephemeral=True
-                    )
-                    return
+            try:
+                await archive_channel(channel, guild_configs.get(interaction.guild_id).archive_category)
+            except discord.Forbidden:
+                await interaction.response.send_message(
+                    "❌ I don't have permission to create categories!", ephemeral=True
+                )
+                return
 
-            await channel.edit(category=archive_category)
             await interaction.response.send_message(f"Archived {channel.name}", ephemeral=True)
         except Exception as e:
+            metrics.command_error(interaction, e)
             await interaction.response.send_message(f"Error: {str(e)}", ephemeral=True)
     else:
         await interaction.response.send_message("Not authorized", ephemeral=True)
 
+@tree.command(name="bulkctf", description="Archive or delete many CTF channels at once.")
+@app_commands.describe(
+    action="What to do with the matching channels",
+    category="Only channels in this category (default: every CTF channel)",
+    before="Only channels with no activity since this date (YYYY-MM-DD)",
+)
+@app_commands.choices(action=[
+    app_commands.Choice(name="archive", value="archive"),
+    app_commands.Choice(name="delete", value="delete"),
+])
+async def bulkctf(
+    interaction: discord.Interaction,
+    action: app_commands.Choice[str],
+    category: Optional[discord.CategoryChannel] = None,
+    before: Optional[str] = None,
+):
+    if _authorized(interaction):
+        try:
+            cutoff = datetime.strptime(before, "%Y-%m-%d") if before else None
+        except ValueError:
+            await interaction.response.send_message("❌ Date must look like YYYY-MM-DD.", ephemeral=True)
+            return
+        # Deleting every CTF channel in one go is never what anyone meant
+        if action.value == "delete" and category is None and cutoff is None:
+            await interaction.response.send_message(
+                "❌ Deleting needs a `category` or `before` filter.", ephemeral=True
+            )
+            return
+
+        await metrics.defer(interaction, ephemeral=True, thinking=True)
+        try:
+            archive_category = guild_configs.get(interaction.guild_id).archive_category
+            channels = select_channels(
+                interaction.guild, channel_messages, category, cutoff,
+                exclude_category=archive_category if action.value == "archive" else None,
+            )
+            if not channels:
+                await interaction.edit_original_response(content="No matching channels found.")
+                return
+
+            operation = BulkOperation(
+                interaction.guild, channel_messages, storage,
+                progress=lambda message: interaction.edit_original_response(content=message),
+                archive_category=archive_category,
+            )
+            if action.value == "delete":
+                await operation.delete(channels)
+                await interaction.edit_original_response(content=operation.summary("Deleted"))
+            else:
+                await operation.archive(channels)
+                await interaction.edit_original_response(content=operation.summary("Archived"))
+        except Exception as e:
+            metrics.command_error(interaction, e)
+            await interaction.edit_original_response(content=f"❌ Error: {str(e)}")
+    else:
+        await interaction.response.send_message("Not authorized", ephemeral=True)
+
 @tree.command(name="delchannel", description="Delete a channel by name.")
 async def delchannel(interaction: discord.Interaction, channel: discord.TextChannel):
-    if interaction.user.id in whitelist:
+    if _authorized(interaction):
         try:
             channel_name = channel.name
             try:
@@ -462,6 +642,7 @@ async def delchannel(interaction: discord.Interaction, channel: discord.TextChan
                 f"Successfully deleted channel: {channel_name}", ephemeral=True
             )
         except Exception as e:
+            metrics.command_error(interaction, e)
             await interaction.response.send_message(
                 f"Error deleting channel: {str(e)}", ephemeral=True
             )
@@ -472,50 +653,318 @@ async def delchannel(interaction: discord.Interaction, channel: discord.TextChan
 
 @tree.command(name="delctfcategory", description="Delete a category and its channels by name.")
 async def delctfcategory(interaction: discord.Interaction, category: discord.CategoryChannel):
-    if interaction.user.id in whitelist:
+    if _authorized(interaction):
+        await metrics.defer(interaction, ephemeral=True, thinking=True)
         try:
-            channels = category.channels
-            
-            # Delete all channels in the category
-            for channel in channels:
-                try:
-                    await channel.delete()
-                except discord.Forbidden:
-                    await interaction.response.send_message(
-                        f"❌ I don't have permission to delete {channel.name}!", ephemeral=True
-                    )
-                    return
-            
+            # Delete all channels in the category concurrently, with their CTF roles
+            operation = BulkOperation(
+                interaction.guild, channel_messages, storage,
+                progress=lambda message: interaction.edit_original_response(content=message),
+            )
+            await operation.delete(list(category.channels))
+            if operation.failures:
+                await interaction.edit_original_response(content=operation.summary("Deleted"))
+                return
+
             # Delete the category itself
             try:
                 await category.delete()
             except discord.Forbidden:
-                await interaction.response.send_message(
-                    "❌ I don't have permission to delete the category!", ephemeral=True
+                await interaction.edit_original_response(
+                    content="❌ I don't have permission to delete the category!"
                 )
                 return
-            
-            await interaction.response.send_message(
-                f"Successfully deleted category: {category.name}", ephemeral=True
+
+            await interaction.edit_original_response(
+                content=f"Successfully deleted category: {category.name}"
             )
         except Exception as e:
-            await interaction.response.send_message(
-                f"Error deleting category: {str(e)}", ephemeral=True
+            metrics.command_error(interaction, e)
+            await interaction.edit_original_response(
+                content=f"Error deleting category: {str(e)}"
             )
     else:
         await interaction.response.send_message(
             "You are not authorized to use this command!", ephemeral=True
         )
 
+@tree.command(name="ctfpoll", description="Post a poll asking whether to play a CTF (by CTF Time ID).")
+async def ctfpoll(interaction: discord.Interaction, eventid: int):
+    if not _authorized(interaction):
+        await interaction.response.send_message("❌ Not authorized", ephemeral=True)
+        return
+
+    await metrics.defer(interaction, ephemeral=True, thinking=True)
+    try:
+        event = await event_cache.get(eventid)
+        await polls.post(interaction.channel, event)
+        await interaction.followup.send(f"✅ Poll posted for **{event['title']}**", ephemeral=True)
+    except CTFTimeError as e:
+        if e.status == 404:
+            await interaction.followup.send(f"❌ CTF with ID {eventid} not found.", ephemeral=True)
+        else:
+            await interaction.followup.send(f"❌ Error fetching CTF info: {str(e)}", ephemeral=True)
+    except Exception as e:
+        metrics.command_error(interaction, e)
+        await interaction.followup.send(f"❌ Error posting poll: {str(e)}", ephemeral=True)
+
+@tree.command(name="pollresults", description="Show poll results for a CTF, or the top polls.")
+async def pollresults(interaction: discord.Interaction, eventid: Optional[int] = None):
+    # Read straight from the in-memory tallies
+    if eventid is not None:
+        poll = polls.get(eventid)
+        if poll is None:
+            await interaction.response.send_message(f"No poll found for CTF {eventid}.", ephemeral=True)
+            return
+        names = ", ".join(p["displayname"] for p in poll.yes.values()) or "nobody yet"
+        await interaction.response.send_message(
+            f"**{poll.name}**: {YES} {len(poll.yes)} / {NO} {len(poll.no)}\nPlaying: {names}",
+            ephemeral=True,
+        )
+        return
+
+    standings = polls.standings()[:10]
+    if not standings:
+        await interaction.response.send_message("No polls yet.", ephemeral=True)
+        return
+    lines = [f"**{poll.name}** ({poll.event_id}): {YES} {len(poll.yes)} / {NO} {len(poll.no)}" for poll in standings]
+    await interaction.response.send_message("\n".join(lines), ephemeral=True)
+
+@tree.command(name="trackteam", description="Post a CTFtime team's new placements and rating changes here.")
+@app_commands.describe(team_id="CTFtime team id", enabled="Start (true) or stop (false) tracking in this channel")
+async def trackteam(interaction: discord.Interaction, team_id: int, enabled: bool = True):
+    if not _authorized(interaction):
+        await interaction.response.send_message("❌ Not authorized", ephemeral=True)
+        return
+
+    if not enabled:
+        removed = await team_tracker.untrack(team_id, interaction.channel_id)
+        message = f"Stopped tracking team {team_id} here." if removed else f"Team {team_id} isn't tracked here."
+        await interaction.response.send_message(message, ephemeral=True)
+        return
+
+    await metrics.defer(interaction, ephemeral=True, thinking=True)
+    try:
+        standing = await team_tracker.track(team_id, interaction.channel_id)
+        name = standing.name if standing else f"team {team_id}"
+        place = f" (currently #{standing.rating_place})" if standing and standing.rating_place else ""
+        await interaction.followup.send(f"✅ Tracking **{name}**{place} in this channel.", ephemeral=True)
+    except CTFTimeError as e:
+        if e.status == 404:
+            await interaction.followup.send(f"❌ CTFtime team {team_id} not found.", ephemeral=True)
+        else:
+            await interaction.followup.send(f"❌ Error fetching CTFtime team: {str(e)}", ephemeral=True)
+    except Exception as e:
+        metrics.command_error(interaction, e)
+        await interaction.followup.send(f"❌ Error tracking team: {str(e)}", ephemeral=True)
+
+@tree.command(name="ctfcalendar", description="Get this server's private calendar feed of CTFs and events.")
+@app_commands.guild_only()
+async def ctfcalendar(interaction: discord.Interaction):
+    try:
+        token = await calendar.token_for(interaction.guild_id)
+    except Exception as e:
+        metrics.command_error(interaction, e)
+        await interaction.response.send_message(f"❌ Error creating calendar link: {str(e)}", ephemeral=True)
+        return
+    base_url = os.environ.get("PUBLIC_URL", "").rstrip("/")
+    await interaction.response.send_message(
+        f"📅 Subscribe to `{base_url}/calendar/{token}.ics` (available once this server has a /createevent event). "
+        f"Keep it private; the public feed of CTFtime events is `{base_url}/calendar.ics`.",
+        ephemeral=True,
+    )
+
+# Per-guild settings, editable by server managers
+ctfconfig = app_commands.Group(
+    name="ctfconfig",
+    description="Configure the CTF bot for this server.",
+    guild_only=True,
+    default_permissions=discord.Permissions(manage_guild=True),
+)
+
+def _describe_config(config: GuildConfig) -> str:
+    users = ", ".join(f"<@{user_id}>" for user_id in sorted(config.authorized_users)) or "none"
+    roles = ", ".join(f"<@&{role_id}>" for role_id in sorted(config.authorized_roles)) or "none"
+    channels = ", ".join(f"<#{channel_id}>" for channel_id in config.announcement_channels) or "none"
+    return (
+        f"**Authorized users:** {users}\n"
+        f"**Authorized roles:** {roles}\n"
+        f"**Announcement channels:** {channels}\n"
+        f"**CTF category:** {config.ctf_category}\n"
+        f"**Archive category:** {config.archive_category}"
+    )
+
+@ctfconfig.command(name="show", description="Show this server's CTF bot settings.")
+async def ctfconfig_show(interaction: discord.Interaction):
+    config = guild_configs.get(interaction.guild_id)
+    await interaction.response.send_message(_describe_config(config), ephemeral=True)
+
+@ctfconfig.command(name="authorize", description="Allow a member or role to manage CTF channels.")
+@app_commands.describe(target="Member or role", allowed="Grant (true) or revoke (false) access")
+async def ctfconfig_authorize(
+    interaction: discord.Interaction,
+    target: Union[discord.Member, discord.Role],
+    allowed: bool = True,
+):
+    config = guild_configs.get_stored(interaction.guild_id)
+    field = "authorized_roles" if isinstance(target, discord.Role) else "authorized_users"
+    ids = set(getattr(config, field))
+    if allowed:
+        ids.add(target.id)
+    else:
+        ids.discard(target.id)
+    try:
+        config = await guild_configs.update(interaction.guild_id, **{field: ids})
+        await interaction.response.send_message(_describe_config(config), ephemeral=True)
+    except Exception as e:
+        metrics.command_error(interaction, e)
+        await interaction.response.send_message(f"❌ Error saving settings: {str(e)}", ephemeral=True)
+
+@ctfconfig.command(name="announcements", description="Add or remove a CTF announcement channel.")
+@app_commands.describe(channel="Channel new CTFs are announced in", enabled="Announce here (true) or stop (false)")
+async def ctfconfig_announcements(interaction: discord.Interaction, channel: discord.TextChannel, enabled: bool = True):
+    config = guild_configs.get(interaction.guild_id)
+    # Start from the channels in effect here; ones in other servers are dropped
+    channels = [c for c in config.announcement_channels if c != channel.id and interaction.guild.get_channel(c)]
+    if enabled:
+        channels.append(channel.id)
+    try:
+        config = await guild_configs.update(interaction.guild_id, announcement_channels=channels)
+        await interaction.response.send_message(_describe_config(config), ephemeral=True)
+    except Exception as e:
+        metrics.command_error(interaction, e)
+        await interaction.response.send_message(f"❌ Error saving settings: {str(e)}", ephemeral=True)
+
+@ctfconfig.command(name="categories", description="Set the category names for new and archived CTF channels.")
+@app_commands.describe(ctf="Category for new CTF channels", archive="Category for archived CTF channels")
+async def ctfconfig_categories(
+    interaction: discord.Interaction,
+    ctf: Optional[app_commands.Range[str, 1, 100]] = None,
+    archive: Optional[app_commands.Range[str, 1, 100]] = None,
+):
+    changes = {}
+    if ctf:
+        changes["ctf_category"] = ctf
+    if archive:
+        changes["archive_category"] = archive
+    if not changes:
+        await interaction.response.send_message("❌ Give a ctf or archive category name.", ephemeral=True)
+        return
+    try:
+        config = await guild_configs.update(interaction.guild_id, **changes)
+        await interaction.response.send_message(_describe_config(config), ephemeral=True)
+    except Exception as e:
+        metrics.command_error(interaction, e)
+        await interaction.response.send_message(f"❌ Error saving settings: {str(e)}", ephemeral=True)
+
+tree.add_command(ctfconfig)
+
+# Count a reaction on a poll message in memory; returns False for other messages
+def _poll_reaction(payload: discord.RawReactionActionEvent, added: bool) -> bool:
+    if not polls.is_poll(payload.message_id):
+        return False
+    if client.user is not None and payload.user_id == client.user.id:
+        return True
+    return polls.react(payload.message_id, payload.user_id, str(payload.emoji), added, payload.member)
+
+# Resolve a 👍 reaction on an announcement to its CTF role (message need not be cached)
+def _reaction_role(payload: discord.RawReactionActionEvent) -> Optional[int]:
+    if payload.guild_id is None or str(payload.emoji) != "👍":
+        return None
+    if client.user is not None and payload.user_id == client.user.id:
+        return None
+    record = channel_messages.get(payload.message_id)
+    return record.role_id if record else None
+
 @client.event
-async def on_ready():
-    initialize_votes_file()
-    global channel_messages
-    channel_messages = await load_channel_messages()
+async def on_raw_reaction_add(payload: discord.RawReactionActionEvent):
+    if _poll_reaction(payload, True):
+        return
+    role_id = _reaction_role(payload)
+    if role_id is not None and not (payload.member and payload.member.bot):
+        role_grants.submit(payload.guild_id, payload.user_id, role_id, True)
+
+@client.event
+async def on_raw_reaction_remove(payload: discord.RawReactionActionEvent):
+    if _poll_reaction(payload, False):
+        return
+    role_id = _reaction_role(payload)
+    if role_id is not None:
+        role_grants.submit(payload.guild_id, payload.user_id, role_id, False)
+
+@client.event
+async def on_app_command_completion(interaction: discord.Interaction, command):
+    metrics.command_finished(interaction)
+
+# Hash of the command definitions as Discord sees them
+def command_tree_hash() -> str:
+    payload = {
+        "application_id": client.application_id,
+        "commands": sorted(
+            (command.to_dict(tree) for command in tree.get_commands()),
+            key=lambda command: command["name"],
+        ),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+# Only hit the rate-limited global sync endpoint when the commands changed
+async def sync_commands_if_changed():
+    digest = command_tree_hash()
+    if await storage.get_meta("command_tree_hash") == digest:
+        logging.info("Command tree unchanged; skipping sync")
+        return
     try:
         await tree.sync()
+        await storage.put_meta("command_tree_hash", digest)
     except Exception as e:
         logging.error(f"Error syncing commands: {str(e)}")
+
+# The legacy whitelist and announcement channel belong to this guild only
+def resolve_home_guild():
+    home = next(filter(None, map(client.get_channel, ANNOUNCEMENT_CHANNELS)), None)
+    guild_configs.set_home_guild(home.guild.id if home else None)
+
+# Check channel_messages against the guild cache once it is populated, and
+# grant roles for reactions added while the bot was offline
+async def reconcile_channel_messages():
+    await client.wait_until_ready()
+    resolve_home_guild()  # _ready is set before on_ready is dispatched
+    try:
+        report = await Reconciler(
+            client, channel_messages, storage, role_grants,
+            candidates=lambda guild: guild_configs.get(guild.id).announcement_channels,
+            archived=lambda channel: (channel.category is not None
+                                      and channel.category.name == guild_configs.get(channel.guild.id).archive_category),
+        ).run()
+        logging.info(f"Reconciled channel messages: {report}")
+    except Exception as e:
+        logging.error(f"Error reconciling channel messages: {str(e)}")
+
+reconcile_task: Optional[asyncio.Task] = None
+
+# One-time initialization, called from CTFBot.setup_hook
+async def startup():
+    await open_storage()  # Imports votes.json/channel_messages.json on first run
+    await guild_configs.load()
+    await calendar.load()
+    global channel_messages, reconcile_task
+    channel_messages = await load_channel_messages()
+    event_cache.load()  # Warm restart of the /moreinfo cache
+    event_index.schedule_refresh()  # Warm the autocomplete index
+    upcoming_feed.start()
+    role_grants.start()
+    reconcile_task = asyncio.create_task(reconcile_channel_messages())  # Runs once the gateway is ready
+    await scheduler.load()  # Pending reminders and archives survive restarts
+    await polls.load()
+    polls.start()
+    await team_tracker.load()
+    team_tracker.start()
+    scheduler.start()
+    await sync_commands_if_changed()
+
+@client.event
+async def on_ready():
+    resolve_home_guild()
     logging.info("Bot is ready and running!")
 
 # Run the bot
@@ -525,4 +974,7 @@ if __name__ == "__main__":
         logging.error("Error: Discord token not found in secrets!")
         exit(1)
         
-    client.run(token)
+    try:
+        client.run(token, log_handler=None)  # Keep discord.py's own handler off the root logger
+    finally:
+        log_listener.stop()
@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+import discord
+
+from registry import ChannelRegistry
+from storage import Storage
+
+ARCHIVE_CATEGORY = "Archived CTFs"
+# Discord caps a category at 50 channels
+CATEGORY_CHANNEL_LIMIT = 50
+
+# Concurrent requests allowed per kind of REST call. Channel deletes and edits
+# are bucketed per channel, so several can run at once; role deletes share one
+# guild-wide bucket and channel moves also touch the guild's position ordering.
+ROUTE_CONCURRENCY = {"delete_channel": 4, "move_channel": 2, "delete_role": 1}
+
+Progress = Callable[[str], Awaitable[None]]
+
+
+# Most recent activity in a channel, from its last message id (or its creation)
+def last_activity(channel: discord.abc.GuildChannel) -> datetime:
+    last_message_id = getattr(channel, "last_message_id", None)
+    if last_message_id:
+        return discord.utils.snowflake_time(last_message_id)
+    return channel.created_at
+
+
+# Text channels to operate on: everything in `category`, or every CTF channel
+# in the registry, optionally only those with no activity since `before`.
+# Channels in a category named `exclude_category` (e.g. already archived) are skipped.
+def select_channels(
+    guild: discord.Guild,
+    registry: ChannelRegistry,
+    category: Optional[discord.CategoryChannel] = None,
+    before: Optional[datetime] = None,
+    exclude_category: Optional[str] = None,
+) -> List[discord.TextChannel]:
+    if category is not None:
+        channels = [c for c in category.channels if isinstance(c, discord.TextChannel)]
+    else:
+        channel_ids = {record.channel_id for record in registry}
+        channels = [c for c in guild.text_channels if c.id in channel_ids]
+    if exclude_category is not None:
+        channels = [c for c in channels if c.category is None or c.category.name != exclude_category]
+    if before is not None:
+        if before.tzinfo is None:
+            before = before.replace(tzinfo=timezone.utc)
+        channels = [c for c in channels if last_activity(c) < before]
+    return channels
+
+
+# Find an archive category with room for another channel, creating one if needed.
+# `counts` overrides the cached channel count of categories the caller is filling.
+async def get_archive_category(
+    guild: discord.Guild, reserve: int = 1, name: str = ARCHIVE_CATEGORY,
+    counts: Optional[Dict[int, int]] = None,
+) -> discord.CategoryChannel:
+    for category in guild.categories:
+        used = len(category.channels)
+        if counts is not None:
+            used = counts.get(category.id, used)
+        if category.name == name and used + reserve <= CATEGORY_CHANNEL_LIMIT:
+            return category
+    return await guild.create_category(name)
+
+
+async def archive_channel(channel: discord.TextChannel, category_name: str = ARCHIVE_CATEGORY) -> discord.CategoryChannel:
+    archive_category = await get_archive_category(channel.guild, name=category_name)
+    await channel.edit(category=archive_category)
+    return archive_category
+
+
+# Runs channel deletes/moves for many channels with per-route concurrency limits,
+# then removes the matching CTF roles and channel_messages entries in one batch
+class BulkOperation:
+    def __init__(
+        self,
+        guild: discord.Guild,
+        registry: ChannelRegistry,
+        storage: Storage,
+        progress: Optional[Progress] = None,
+        progress_interval: float = 2.0,
+        archive_category: str = ARCHIVE_CATEGORY,
+    ):
+        self.guild = guild
+        self.registry = registry
+        self.storage = storage
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self.archive_category_name = archive_category
+        self.limits = {route: asyncio.Semaphore(n) for route, n in ROUTE_CONCURRENCY.items()}
+        self.done = 0
+        self.total = 0
+        self.failures: Dict[str, str] = {}
+        self._last_report = 0.0
+        self._archive_lock = asyncio.Lock()
+        self._archive_category: Optional[discord.CategoryChannel] = None
+        # Channels per archive category, counting our own moves; the cache only
+        # catches up when the CHANNEL_UPDATE events arrive
+        self._category_counts: Dict[int, int] = {}
+
+    async def _report(self, force: bool = False):
+        now = time.monotonic()
+        if self.progress is None or (not force and now - self._last_report < self.progress_interval):
+            return
+        self._last_report = now
+        message = f"⏳ {self.done}/{self.total} done"
+        if self.failures:
+            message += f", {len(self.failures)} failed"
+        try:
+            await self.progress(message)
+        except Exception as e:
+            logging.error(f"Error reporting bulk progress: {str(e)}", extra={"guild": self.guild.id})
+
+    async def _step(self, route: str, label: str, coro_fn: Callable[[], Awaitable[None]]) -> bool:
+        async with self.limits[route]:
+            try:
+                await coro_fn()
+                return True
+            except discord.NotFound:
+                return True  # Already gone
+            except Exception as e:
+                self.failures[label] = str(e)
+                return False
+            finally:
+                self.done += 1
+                await self._report()
+
+    def _count(self, category: discord.CategoryChannel) -> int:
+        return self._category_counts.setdefault(category.id, len(category.channels))
+
+    # Pick an archive category with room and reserve a slot in it, shared between concurrent moves
+    async def _next_archive_category(self) -> discord.CategoryChannel:
+        async with self._archive_lock:
+            category = self._archive_category
+            if category is None or self._count(category) >= CATEGORY_CHANNEL_LIMIT:
+                category = await get_archive_category(
+                    self.guild, name=self.archive_category_name, counts=self._category_counts
+                )
+                self._archive_category = category
+            self._category_counts[category.id] = self._count(category) + 1
+            return category
+
+    async def _move(self, channel: discord.TextChannel):
+        category = await self._next_archive_category()
+        await channel.edit(category=category)
+
+    async def archive(self, channels: List[discord.TextChannel]):
+        self.total += len(channels)
+        await asyncio.gather(*(
+            self._step("move_channel", channel.name, lambda c=channel: self._move(c))
+            for channel in channels
+        ))
+        await self._report(force=True)
+
+    async def delete(self, channels: List[discord.TextChannel], cleanup_roles: bool = True):
+        # Roles to remove: those recorded for the channels plus any CTF-<name> role
+        role_ids: Set[int] = set()
+        message_ids: List[int] = []
+        for channel in channels:
+            for record in self.registry.by_channel(channel.id):
+                role_ids.add(record.role_id)
+                message_ids.append(record.message_id)
+            role = discord.utils.get(self.guild.roles, name=f"CTF-{channel.name}")
+            if role is not None:
+                role_ids.add(role.id)
+        roles = [r for r in map(self.guild.get_role, role_ids) if r is not None] if cleanup_roles else []
+
+        self.total += len(channels) + len(roles)
+        results = await asyncio.gather(*(
+            self._step("delete_channel", channel.name, channel.delete) for channel in channels
+        ))
+        deleted_ids = {channel.id for channel, ok in zip(channels, results) if ok}
+
+        # Keep roles whose channels survived, so members don't lose access to them
+        survivors = {
+            record.role_id for record in self.registry
+            if record.channel_id not in deleted_ids
+        }
+        await asyncio.gather(*(
+            self._step("delete_role", role.name, role.delete)
+            for role in roles if role.id not in survivors
+        ))
+        self.done += sum(1 for role in roles if role.id in survivors)
+
+        # Forget the announcements for every deleted channel in one storage batch
+        removed = [
+            m for m in message_ids
+            if (record := self.registry.get(m)) is not None and record.channel_id in deleted_ids
+        ]
+        for message_id in removed:
+            self.registry.remove(message_id)
+        try:
+            await self.storage.delete_announcements(removed)
+        except Exception as e:
+            logging.error(f"Error removing channel messages: {str(e)}", extra={"guild": self.guild.id})
+        await self._report(force=True)
+
+    def summary(self, verb: str) -> str:
+        ok = self.done - len(self.failures)
+        message = f"✅ {verb} {ok}/{self.total}"
+        if self.failures:
+            details = "\n".join(f"❌ {label}: {error}" for label, error in list(self.failures.items())[:10])
+            message += f"\n{details}"
+        return message
@@ -0,0 +1,193 @@
+import hashlib
+import secrets
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+from ctftime import parse_ctftime
+from event_index import EventIndex
+from storage import Storage
+
+EVENTS_COLLECTION = "events"
+# guild id -> secret token naming that guild's private feed URL
+TOKENS_COLLECTION = "calendar_tokens"
+# Rendered calendars kept in memory, least recently served dropped first
+MAX_ARTIFACTS = 64
+CONTENT_TYPE = "text/calendar; charset=utf-8"
+# Calendar clients may reuse a copy this long before revalidating
+MAX_AGE = 300
+PRODID = "-//CTF Discord Bot//Upcoming CTFs//EN"
+
+
+def _escape(text: str) -> str:
+    return (str(text).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+# Fold content lines at 75 octets as RFC 5545 requires
+def _fold(line: str) -> str:
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line
+    parts = []
+    while encoded:
+        size = 75 if not parts else 74
+        # Don't split a multi-byte character
+        while size < len(encoded) and (encoded[size] & 0xC0) == 0x80:
+            size -= 1
+        parts.append(encoded[:size].decode())
+        encoded = encoded[size:]
+    return "\r\n ".join(parts)
+
+
+def _stamp(moment: datetime) -> str:
+    return moment.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _strip_stamps(body: bytes) -> bytes:
+    return b"\r\n".join(line for line in body.split(b"\r\n") if not line.startswith(b"DTSTAMP:"))
+
+
+def _vevent(uid: str, start: datetime, end: datetime, summary: str, stamp: str,
+            url: Optional[str] = None, description: Optional[str] = None) -> List[str]:
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART:{_stamp(start)}",
+        f"DTEND:{_stamp(end)}",
+        f"SUMMARY:{_escape(summary)}",
+    ]
+    if url:
+        lines.append(f"URL:{url}")
+    if description:
+        lines.append(f"DESCRIPTION:{_escape(description)}")
+    lines.append("END:VEVENT")
+    return lines
+
+
+def _ctftime_vevent(event: Dict[str, Any], stamp: str) -> List[str]:
+    details = [f"Format: {event.get('format', '')}", f"Weight: {event.get('weight', '')}", event.get("ctftime_url", "")]
+    return _vevent(
+        f"ctftime-{event['id']}@ctftime.org",
+        parse_ctftime(event["start"]),
+        parse_ctftime(event["finish"]),
+        event["title"],
+        stamp,
+        url=event.get("url"),
+        description="\n".join(d for d in details if d),
+    )
+
+
+# Team events from /createevent; the CTF code stays out of the public feed
+def _team_vevent(event: Dict[str, Any], stamp: str) -> List[str]:
+    return _vevent(
+        f"event-{event['id']}@discord",
+        datetime.fromtimestamp(event["start"], timezone.utc),
+        datetime.fromtimestamp(event["end"], timezone.utc),
+        event["event_name"],
+        stamp,
+    )
+
+
+# One rendered calendar and its validator; never mutated after creation
+class _Artifact:
+    __slots__ = ("fingerprint", "body", "etag")
+
+    def __init__(self, fingerprint: Tuple[Any, ...], body: bytes):
+        self.fingerprint = fingerprint
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+# .ics feed of the cached CTFtime window plus each guild's /createevent events.
+# Each calendar is rendered once per change to its inputs and then served as a
+# static body with an ETag, so polling clients mostly get 304s. A guild's feed
+# lives at an unguessable per-guild token, not at its (public) snowflake.
+class CalendarFeed:
+    def __init__(self, index: EventIndex, storage: Storage, has_guild: Callable[[int], bool]):
+        self.index = index
+        self.storage = storage
+        self.has_guild = has_guild
+        self._team_events: Dict[str, Dict[str, Any]] = {}
+        self._version = 0
+        self._tokens: Dict[int, str] = {}
+        self._guilds_by_token: Dict[str, int] = {}
+        self._artifacts: "OrderedDict[Optional[int], _Artifact]" = OrderedDict()
+
+    async def load(self):
+        self._team_events = await self.storage.get_all(EVENTS_COLLECTION)
+        self._version += 1
+        tokens = await self.storage.get_all(TOKENS_COLLECTION)
+        self._tokens = {int(guild_id): token for guild_id, token in tokens.items()}
+        self._guilds_by_token = {token: guild_id for guild_id, token in self._tokens.items()}
+
+    # The guild's feed token, created on first use
+    async def token_for(self, guild_id: int) -> str:
+        token = self._tokens.get(guild_id)
+        if token is None:
+            token = secrets.token_urlsafe(24)
+            await self.storage.put(TOKENS_COLLECTION, guild_id, token)
+            self._tokens[guild_id] = token
+            self._guilds_by_token[token] = guild_id
+        return token
+
+    def _has_events(self, guild_id: int) -> bool:
+        return any(event.get("guild_id") == guild_id for event in self._team_events.values())
+
+    # Call after persisting a /createevent event
+    def add_event(self, event: Dict[str, Any]):
+        self._team_events[str(event["id"])] = event
+        self._version += 1
+
+    def _render(self, guild_id: Optional[int]) -> bytes:
+        stamp = _stamp(datetime.now(timezone.utc))
+        lines = [
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            f"PRODID:{PRODID}",
+            "CALSCALE:GREGORIAN",
+            "X-WR-CALNAME:Upcoming CTFs",
+        ]
+        for event in self.index.events:
+            lines.extend(_ctftime_vevent(event, stamp))
+        if guild_id is not None:
+            for event in self._team_events.values():
+                if event.get("guild_id") == guild_id:
+                    lines.extend(_team_vevent(event, stamp))
+        lines.append("END:VCALENDAR")
+        return ("\r\n".join(_fold(line) for line in lines) + "\r\n").encode()
+
+    # The calendar for one guild (None: CTFtime events only), rebuilt only when stale
+    def get(self, guild_id: Optional[int] = None) -> _Artifact:
+        if self.index.is_stale():
+            self.index.schedule_refresh()  # Serve what we have; the next request sees the refresh
+        fingerprint = (self.index.fetched_at, self._version if guild_id is not None else None)
+        artifact = self._artifacts.get(guild_id)
+        if artifact is None or artifact.fingerprint != fingerprint:
+            body = self._render(guild_id)
+            # Keep the old validator when only DTSTAMP would differ
+            if artifact is not None and _strip_stamps(artifact.body) == _strip_stamps(body):
+                body = artifact.body
+            artifact = self._artifacts[guild_id] = _Artifact(fingerprint, body)
+        self._artifacts.move_to_end(guild_id)
+        while len(self._artifacts) > MAX_ARTIFACTS:
+            self._artifacts.popitem(last=False)
+        return artifact
+
+    # aiohttp handler for /calendar.ics and /calendar/{token}.ics
+    async def handle(self, request: web.Request) -> web.Response:
+        guild_id = None
+        token = request.match_info.get("token")
+        if token is not None:
+            guild_id = self._guilds_by_token.get(token)
+            if guild_id is None or not self.has_guild(guild_id) or not self._has_events(guild_id):
+                raise web.HTTPNotFound()
+        artifact = self.get(guild_id)
+        headers = {"ETag": artifact.etag, "Cache-Control": f"public, max-age={MAX_AGE}"}
+        if artifact.etag in request.headers.get("If-None-Match", ""):
+            return web.Response(status=304, headers=headers)
+        headers["Content-Type"] = CONTENT_TYPE
+        return web.Response(body=artifact.body, headers=headers)
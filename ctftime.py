@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+import aiohttp
+
+import metrics
+from throttle import SingleFlight
+
+CTFTIME_SITE = "https://ctftime.org"
+CTFTIME_API = f"{CTFTIME_SITE}/api/v1"
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_11_5) AppleWebKit/537.36"
+                  " (KHTML, like Gecko) Chrome/50.0.2661.102 Safari/537.36"
+}
+CTFTIME_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
+
+# Status codes worth retrying: throttling and transient upstream failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CTFTimeError(Exception):
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+# Parse a CTFtime timestamp such as "2025-01-11T00:00:00+00:00"
+def parse_ctftime(value: str) -> datetime:
+    return datetime.strptime(value, CTFTIME_TIME_FORMAT)
+
+
+# Long-lived CTFtime API client sharing one pooled aiohttp session
+class CTFTimeClient:
+    def __init__(
+        self,
+        base_url: str = CTFTIME_API,
+        max_connections: int = 10,
+        keepalive_timeout: float = 30.0,
+        total_timeout: float = 10.0,
+        connect_timeout: float = 3.0,
+        retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 8.0,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, connect=connect_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._inflight = SingleFlight("ctftime")
+
+    # The session is created lazily so it binds to the running event loop
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                headers=HEADERS,
+                raise_for_status=False,
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    # Delay before the next attempt, honouring Retry-After when upstream sends it
+    def _retry_delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass
+        delay = min(self.backoff * (2 ** attempt), self.max_backoff)
+        return delay * (0.5 + random.random() / 2)
+
+    # GET a CTFtime API path (or absolute site URL), retrying on 429/5xx. Returns
+    # (status, headers, body), the body decoded as JSON or kept as text; it is
+    # None for 304 Not Modified. Identical concurrent requests share one call.
+    async def _get(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        as_text: bool = False,
+    ) -> Tuple[int, Mapping[str, str], Any]:
+        key = (
+            path,
+            tuple(sorted((params or {}).items())),
+            tuple(sorted((headers or {}).items())),
+            as_text,
+        )
+        return await self._inflight.do(key, lambda: self._fetch(path, params, headers, as_text))
+
+    async def _fetch(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]],
+        headers: Optional[Dict[str, str]],
+        as_text: bool,
+    ) -> Tuple[int, Mapping[str, str], Any]:
+        if "://" in path:
+            url = path
+            endpoint = metrics.route_label(urlsplit(path).path)
+        else:
+            url = f"{self.base_url}/{path.lstrip('/')}"
+            endpoint = metrics.route_label(path)
+        session = self._get_session()
+        last_error: Optional[CTFTimeError] = None
+
+        for attempt in range(self.retries + 1):
+            started = time.perf_counter()
+            try:
+                async with session.get(url, params=params, headers=headers) as response:
+                    metrics.ctftime_latency.observe(time.perf_counter() - started, endpoint=endpoint)
+                    metrics.ctftime_responses.inc(endpoint=endpoint, status=str(response.status))
+                    if response.status == 200:
+                        body = await response.text() if as_text else await response.json(content_type=None)
+                        return response.status, response.headers, body
+                    if response.status == 304:
+                        return response.status, response.headers, None
+                    last_error = CTFTimeError(
+                        f"CTFtime returned HTTP {response.status} for {path}", response.status
+                    )
+                    if response.status not in RETRY_STATUSES:
+                        raise last_error
+                    retry_after = response.headers.get("Retry-After")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                metrics.ctftime_latency.observe(time.perf_counter() - started, endpoint=endpoint)
+                metrics.ctftime_responses.inc(endpoint=endpoint, status="0")
+                last_error = CTFTimeError(f"CTFtime request failed: {e!r}")
+                retry_after = None
+
+            if attempt < self.retries:
+                delay = self._retry_delay(attempt, retry_after)
+                logging.warning(
+                    f"{last_error}; retrying in {delay:.2f}s",
+                    extra={"endpoint": endpoint, "status": last_error.status},
+                )
+                await asyncio.sleep(delay)
+
+        raise last_error
+
+    # GET a CTFtime API path and decode the JSON body
+    async def get_json(self, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        _, _, data = await self._get(path, params=params)
+        return data
+
+    # Conditional GET: returns (data, etag, last_modified), with data None when unchanged
+    async def get_conditional(
+        self,
+        path: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        as_text: bool = False,
+    ) -> Tuple[Any, Optional[str], Optional[str]]:
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        _, response_headers, data = await self._get(path, headers=headers or None, as_text=as_text)
+        return (
+            data,
+            response_headers.get("ETag", etag),
+            response_headers.get("Last-Modified", last_modified),
+        )
+
+    # Conditional GET of an HTML page on the CTFtime site, e.g. "team/1234"
+    async def get_page_conditional(
+        self,
+        path: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        return await self.get_conditional(
+            f"{CTFTIME_SITE}/{path.lstrip('/')}", etag=etag, last_modified=last_modified, as_text=True
+        )
+
+    # Events whose window falls between the two unix timestamps
+    async def events(self, start: int, finish: int, limit: int = 100) -> List[Dict[str, Any]]:
+        return await self.get_json(
+            "events/", params={"limit": limit, "start": start, "finish": finish}
+        )
+
+    # Details of a single event by CTFtime id
+    async def event(self, event_id: int) -> Dict[str, Any]:
+        return await self.get_json(self.event_path(event_id))
+
+    @staticmethod
+    def event_path(event_id: int) -> str:
+        return f"events/{int(event_id)}/"
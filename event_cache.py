@@ -0,0 +1,136 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+import metrics
+from ctftime import CTFTimeClient
+
+EVENT_CACHE_FILE = "event_cache.json"
+
+
+class _Entry:
+    __slots__ = ("data", "etag", "last_modified", "expires_at")
+
+    def __init__(self, data: Dict[str, Any], etag: Optional[str], last_modified: Optional[str], expires_at: float):
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+
+# Bounded LRU cache of CTFtime event details, revalidated with conditional
+# requests and snapshotted to disk so it comes back warm after a restart
+class EventCache:
+    def __init__(
+        self,
+        ctftime: CTFTimeClient,
+        path: str = EVENT_CACHE_FILE,
+        max_entries: int = 256,
+        ttl: float = 3600.0,
+        save_delay: float = 30.0,
+    ):
+        self.ctftime = ctftime
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.save_delay = save_delay
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._save_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _store(self, event_id: int, entry: _Entry):
+        self._entries[event_id] = entry
+        self._entries.move_to_end(event_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._schedule_save()
+
+    # Cached details without touching the network (expired entries included)
+    def peek(self, event_id: int) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(event_id)
+        return entry.data if entry else None
+
+    # Seed the cache from CTFtime list results, which carry the same fields
+    def prime(self, events: Iterable[Dict[str, Any]]):
+        expires_at = time.time() + self.ttl
+        for event in events:
+            if event["id"] not in self._entries:
+                self._store(event["id"], _Entry(event, None, None, expires_at))
+
+    async def get(self, event_id: int) -> Dict[str, Any]:
+        entry = self._entries.get(event_id)
+        if entry is not None and entry.expires_at > time.time():
+            self._entries.move_to_end(event_id)
+            metrics.cache_requests.inc(cache="event_details", result="hit")
+            return entry.data
+
+        # Miss or expired: revalidate when we hold validators, otherwise refetch
+        data, etag, last_modified = await self.ctftime.get_conditional(
+            self.ctftime.event_path(event_id),
+            etag=entry.etag if entry else None,
+            last_modified=entry.last_modified if entry else None,
+        )
+        if data is None and entry is not None:
+            data = entry.data  # 304 Not Modified
+            metrics.cache_requests.inc(cache="event_details", result="revalidated")
+        else:
+            metrics.cache_requests.inc(cache="event_details", result="miss")
+        self._store(event_id, _Entry(data, etag, last_modified, time.time() + self.ttl))
+        return data
+
+    # Load the on-disk snapshot; expiry times are wall-clock so they survive restarts
+    def load(self):
+        try:
+            with open(self.path, "r") as file:
+                raw = json.load(file)
+        except FileNotFoundError:
+            return
+        except (json.JSONDecodeError, OSError) as e:
+            logging.error(f"Error loading event cache: {str(e)}")
+            return
+
+        for item in raw[-self.max_entries:]:
+            self._entries[int(item["id"])] = _Entry(
+                item["data"], item.get("etag"), item.get("last_modified"), item["expires_at"]
+            )
+
+    def _write(self, items):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(items, file)
+        os.replace(tmp_path, self.path)
+
+    # Write the snapshot off the event loop; entries are stored least recently used first
+    async def save(self):
+        items = [
+            {"id": event_id, "data": e.data, "etag": e.etag,
+             "last_modified": e.last_modified, "expires_at": e.expires_at}
+            for event_id, e in self._entries.items()
+        ]
+        try:
+            await asyncio.to_thread(self._write, items)
+        except Exception as e:
+            logging.error(f"Error saving event cache: {str(e)}")
+
+    async def _delayed_save(self):
+        await asyncio.sleep(self.save_delay)
+        await self.save()
+
+    # Coalesce bursts of updates into one write
+    def _schedule_save(self):
+        if self._save_task is None or self._save_task.done():
+            try:
+                self._save_task = asyncio.get_running_loop().create_task(self._delayed_save())
+            except RuntimeError:
+                pass  # No running loop (e.g. during load); the next update will schedule it
+
+    async def close(self):
+        if self._save_task is not None and not self._save_task.done():
+            self._save_task.cancel()
+        await self.save()
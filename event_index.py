@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import re
+import time
+import unicodedata
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from dateutil.relativedelta import relativedelta
+
+import metrics
+from ctftime import CTFTimeClient
+from event_cache import EventCache
+
+# Longest prefix stored in the prefix map; longer queries fall back to substring scan
+MAX_PREFIX = 12
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+# Lowercase, strip accents and collapse punctuation so "UofT CTF-2025" matches "uoft ctf 2025"
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    return _NON_ALNUM.sub(" ", text).strip()
+
+
+# Immutable view of one CTFtime fetch plus the lookup tables built from it
+class _Snapshot:
+    __slots__ = ("events", "titles", "normalized", "prefixes", "by_id", "fetched_at")
+
+    def __init__(self, events: List[Dict[str, Any]], fetched_at: float):
+        self.events: Tuple[Dict[str, Any], ...] = tuple(events)
+        self.titles: Tuple[str, ...] = tuple(event["title"] for event in events)
+        self.normalized: Tuple[str, ...] = tuple(normalize(title) for title in self.titles)
+        self.by_id: Dict[int, Dict[str, Any]] = {event["id"]: event for event in events}
+        self.fetched_at = fetched_at
+
+        # Map every prefix of every word-suffix of a title to the titles containing it.
+        # Entries keep insertion order, so matches come back in CTFtime (start date) order.
+        prefixes: Dict[str, Dict[int, None]] = {}
+        for i, title in enumerate(self.normalized):
+            for match in re.finditer(r"\S+", title):
+                tail = title[match.start():match.start() + MAX_PREFIX]
+                for end in range(1, len(tail) + 1):
+                    prefixes.setdefault(tail[:end], {})[i] = None
+        self.prefixes: Dict[str, Tuple[int, ...]] = {k: tuple(v) for k, v in prefixes.items()}
+
+    def search(self, query: str, limit: int) -> List[str]:
+        needle = normalize(query)
+        if not needle:
+            return list(self.titles[:limit])
+
+        hits = self.prefixes.get(needle, ()) if len(needle) <= MAX_PREFIX else ()
+        # Titles that start with the query rank ahead of mid-title word matches
+        ordered = sorted(hits, key=lambda i: not self.normalized[i].startswith(needle))
+        results = [self.titles[i] for i in ordered[:limit]]
+        if len(results) >= limit:
+            return results
+
+        seen = set(ordered)
+        for i, title in enumerate(self.normalized):
+            if i not in seen and needle in title:
+                results.append(self.titles[i])
+                if len(results) >= limit:
+                    break
+        return results
+
+
+# Cached index of upcoming CTFtime events, refreshed on a TTL and served
+# stale while a background refresh runs
+class EventIndex:
+    def __init__(
+        self,
+        ctftime: CTFTimeClient,
+        ttl: float = 300.0,
+        window_days: int = 50,
+        limit: int = 100,
+        cold_timeout: float = 2.0,
+        cache: Optional[EventCache] = None,
+    ):
+        self.ctftime = ctftime
+        self.cache = cache
+        self.ttl = ttl
+        self.window_days = window_days
+        self.limit = limit
+        self.cold_timeout = cold_timeout
+        self._snapshot: Optional[_Snapshot] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def fetched_at(self) -> Optional[float]:
+        return self._snapshot.fetched_at if self._snapshot else None
+
+    # Events from the current snapshot, without triggering a refresh
+    @property
+    def events(self) -> Tuple[Dict[str, Any], ...]:
+        return self._snapshot.events if self._snapshot else ()
+
+    def is_stale(self) -> bool:
+        return self._snapshot is None or time.monotonic() - self._snapshot.fetched_at > self.ttl
+
+    async def _refresh(self):
+        now = datetime.utcnow()
+        start = int(now.timestamp())
+        finish = int((now + relativedelta(days=+self.window_days)).timestamp())
+        events = await self.ctftime.events(start, finish, limit=self.limit)
+        self._snapshot = _Snapshot(events, time.monotonic())
+        if self.cache is not None:
+            self.cache.prime(events)
+
+    # Start a refresh unless one is already running; concurrent callers share it
+    def schedule_refresh(self) -> asyncio.Task:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+            self._refresh_task.add_done_callback(self._log_refresh_error)
+        return self._refresh_task
+
+    @staticmethod
+    def _log_refresh_error(task: asyncio.Task):
+        if not task.cancelled() and task.exception():
+            logging.error(f"Error refreshing CTF event index: {task.exception()}")
+
+    async def _current(self) -> Optional[_Snapshot]:
+        if self._snapshot is None:
+            metrics.cache_requests.inc(cache="event_index", result="miss")
+        elif self.is_stale():
+            metrics.cache_requests.inc(cache="event_index", result="stale")
+        else:
+            metrics.cache_requests.inc(cache="event_index", result="hit")
+        if self.is_stale():
+            task = self.schedule_refresh()
+            if self._snapshot is None:
+                # Cold start: wait briefly for the first fetch, but never past the deadline
+                try:
+                    await asyncio.wait_for(asyncio.shield(task), self.cold_timeout)
+                except Exception:
+                    pass
+        return self._snapshot
+
+    async def search(self, query: str, limit: int = 25) -> List[str]:
+        snapshot = await self._current()
+        return snapshot.search(query, limit) if snapshot else []
+
+    async def get(self, event_id: int) -> Optional[Dict[str, Any]]:
+        snapshot = await self._current()
+        return snapshot.by_id.get(event_id) if snapshot else None
+
+    def close(self):
+        if self._refresh_task is not None and not self._refresh_task.done():
+            self._refresh_task.cancel()
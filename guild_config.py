@@ -0,0 +1,127 @@
+from typing import Any, Dict, Iterable, Optional
+
+import discord
+
+from bulk import ARCHIVE_CATEGORY
+from provisioning import CTF_CATEGORY
+from storage import Storage
+
+GUILD_CONFIG_COLLECTION = "guild_config"
+
+
+# Settings for one guild. Instances are treated as immutable; edits build a new one.
+class GuildConfig:
+    __slots__ = ("guild_id", "authorized_users", "authorized_roles",
+                 "announcement_channels", "ctf_category", "archive_category")
+
+    def __init__(
+        self,
+        guild_id: int,
+        authorized_users: Iterable[int] = (),
+        authorized_roles: Iterable[int] = (),
+        announcement_channels: Iterable[int] = (),
+        ctf_category: str = CTF_CATEGORY,
+        archive_category: str = ARCHIVE_CATEGORY,
+    ):
+        self.guild_id = guild_id
+        self.authorized_users = frozenset(int(u) for u in authorized_users)
+        self.authorized_roles = frozenset(int(r) for r in authorized_roles)
+        self.announcement_channels = tuple(dict.fromkeys(int(c) for c in announcement_channels))
+        self.ctf_category = ctf_category
+        self.archive_category = archive_category
+
+    def is_authorized(self, user: discord.abc.User) -> bool:
+        if user.id in self.authorized_users:
+            return True
+        roles = getattr(user, "roles", ())
+        return any(role.id in self.authorized_roles for role in roles)
+
+    def replace(self, **changes: Any) -> "GuildConfig":
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return GuildConfig(**values)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "authorized_users": sorted(self.authorized_users),
+            "authorized_roles": sorted(self.authorized_roles),
+            "announcement_channels": list(self.announcement_channels),
+            "ctf_category": self.ctf_category,
+            "archive_category": self.archive_category,
+        }
+
+    @classmethod
+    def from_dict(cls, guild_id: int, data: Dict[str, Any]) -> "GuildConfig":
+        return cls(
+            guild_id,
+            data.get("authorized_users", ()),
+            data.get("authorized_roles", ()),
+            data.get("announcement_channels", ()),
+            data.get("ctf_category", CTF_CATEGORY),
+            data.get("archive_category", ARCHIVE_CATEGORY),
+        )
+
+
+# Per-guild configuration held in storage behind an in-memory cache. Guilds
+# without stored settings start empty: nobody is authorized until a server
+# manager runs /ctfconfig. The legacy hard-coded settings apply only to the
+# original home guild, layered over its stored settings and never written
+# into them.
+class GuildConfigStore:
+    def __init__(self, storage: Storage, legacy: Optional[GuildConfig] = None):
+        self.storage = storage
+        self.legacy = legacy
+        self.home_guild_id: Optional[int] = None
+        self._stored: Dict[int, GuildConfig] = {}
+        self._cache: Dict[int, GuildConfig] = {}
+
+    async def load(self):
+        stored = await self.storage.get_all(GUILD_CONFIG_COLLECTION)
+        self._stored = {int(guild_id): GuildConfig.from_dict(int(guild_id), data) for guild_id, data in stored.items()}
+        self._cache.clear()
+
+    # The guild the legacy settings belong to (resolved once the gateway cache is up)
+    def set_home_guild(self, guild_id: Optional[int]):
+        if guild_id != self.home_guild_id:
+            self.home_guild_id = guild_id
+            self._cache.clear()
+
+    # Settings exactly as stored for the guild, without the legacy overlay
+    def get_stored(self, guild_id: Optional[int]) -> GuildConfig:
+        config = self._stored.get(guild_id)
+        return config if config is not None else GuildConfig(guild_id)
+
+    def _effective(self, guild_id: Optional[int]) -> GuildConfig:
+        config = self.get_stored(guild_id)
+        if self.legacy is None or guild_id is None or guild_id != self.home_guild_id:
+            return config
+        return config.replace(
+            authorized_users=config.authorized_users | self.legacy.authorized_users,
+            authorized_roles=config.authorized_roles | self.legacy.authorized_roles,
+            # Until the home guild stores its own channel list
+            announcement_channels=(config.announcement_channels if guild_id in self._stored
+                                   else self.legacy.announcement_channels),
+        )
+
+    def get(self, guild_id: Optional[int]) -> GuildConfig:
+        config = self._cache.get(guild_id)
+        if config is None:
+            config = self._cache[guild_id] = self._effective(guild_id)
+        return config
+
+    async def update(self, guild_id: int, **changes: Any) -> GuildConfig:
+        config = self.get_stored(guild_id)
+        if guild_id not in self._stored and guild_id == self.home_guild_id and self.legacy is not None:
+            # The home guild keeps its legacy announcement channels; users stay a code-level overlay
+            config = config.replace(announcement_channels=self.legacy.announcement_channels)
+        config = config.replace(**changes)
+        await self.storage.put(GUILD_CONFIG_COLLECTION, guild_id, config.to_dict())
+        self._stored[guild_id] = config
+        self._cache.pop(guild_id, None)
+        return self.get(guild_id)
+
+    def invalidate(self, guild_id: Optional[int] = None):
+        if guild_id is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(guild_id, None)
@@ -1,16 +1,105 @@
 # keep_alive.py
-from flask import Flask
-from threading import Thread
+import math
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
 
-app = Flask(__name__)
+import discord
+from aiohttp import web
 
-@app.route('/')
-def home():
-    return "Bot is alive!"
+import metrics
 
-def run():
-    app.run(host='0.0.0.0', port=8080)
+# Returns the monotonic time a cache was last refreshed, or None if never
+FreshnessProbe = Callable[[], Optional[float]]
 
-def keep_alive():
-    t = Thread(target=run)
-    t.start()
+
+# Health, readiness and metrics endpoints served from the bot's own event loop
+class HealthServer:
+    def __init__(self, client: discord.Client, host: str = "0.0.0.0", port: Optional[int] = None):
+        self.client = client
+        self.host = host
+        self.port = port if port is not None else int(os.environ.get("PORT", 8080))
+        self.caches: Dict[str, FreshnessProbe] = {}
+        self.max_cache_age: Dict[str, float] = {}
+        self._runner: Optional[web.AppRunner] = None
+
+        self.app = web.Application()
+        self.app.router.add_get("/", self.home)
+        self.app.router.add_get("/healthz", self.liveness)
+        self.app.router.add_get("/readyz", self.readiness)
+        self.app.router.add_get("/metrics", self.prometheus_metrics)
+
+    # Report a cache's age on /readyz; older than max_age counts as stale
+    def add_cache(self, name: str, probe: FreshnessProbe, max_age: float):
+        self.caches[name] = probe
+        self.max_cache_age[name] = max_age
+
+    # Serve an extra GET endpoint from the same server (register before start())
+    def add_route(self, path: str, handler: Callable[[web.Request], Awaitable[web.StreamResponse]]):
+        self.app.router.add_get(path, handler)
+
+    async def home(self, request: web.Request) -> web.Response:
+        return web.Response(text="Bot is alive!")
+
+    # The process and its event loop are responsive
+    async def liveness(self, request: web.Request) -> web.Response:
+        return web.json_response({"status": "ok"})
+
+    @staticmethod
+    def _latency(latency: float) -> Optional[float]:
+        return None if math.isnan(latency) or math.isinf(latency) else round(latency, 4)
+
+    # Live websocket state per shard; is_ready() stays true across a disconnect
+    def _shard_states(self) -> Dict[str, Dict[str, Any]]:
+        shards = getattr(self.client, "shards", None)
+        if shards:
+            return {
+                str(shard_id): {"connected": not shard.is_closed(), "latency_seconds": self._latency(shard.latency)}
+                for shard_id, shard in shards.items()
+            }
+        ws = self.client.ws
+        return {"0": {
+            "connected": ws is not None and ws.open,
+            "latency_seconds": self._latency(self.client.latency),
+        }}
+
+    # Past the initial READY with every shard's gateway websocket open
+    async def readiness(self, request: web.Request) -> web.Response:
+        shards = self._shard_states()
+        connected = (
+            self.client.is_ready()
+            and not self.client.is_closed()
+            and all(shard["connected"] for shard in shards.values())
+        )
+        now = time.monotonic()
+        caches = {}
+        for name, probe in self.caches.items():
+            refreshed = probe()
+            age = None if refreshed is None else round(now - refreshed, 1)
+            caches[name] = {
+                "age_seconds": age,
+                "stale": age is None or age > self.max_cache_age[name],
+            }
+        body = {
+            "status": "ready" if connected else "not ready",
+            "gateway_connected": connected,
+            "guilds": len(self.client.guilds) if connected else 0,
+            "shards": shards,
+            "caches": caches,
+        }
+        return web.json_response(body, status=200 if connected else 503)
+
+    async def prometheus_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(body=metrics.REGISTRY.render().encode(), headers={"Content-Type": metrics.CONTENT_TYPE})
+
+    async def start(self):
+        if self._runner is not None:
+            return
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,78 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+# Structured fields callers attach with `extra=`; they become top-level JSON keys
+FIELDS = ("command", "guild", "user", "latency_ms", "endpoint", "status", "route", "error")
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+# Fields bound to the running task (e.g. the command it handles). Records logged
+# from it, or from tasks it spawns, get them unless they set their own.
+_bound: ContextVar[Dict[str, Any]] = ContextVar("log_fields", default={})
+
+
+def bind(**fields: Any):
+    _bound.set({**_bound.get(), **fields})
+
+
+# One JSON object per line, for container log pipelines
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+# Hands records to the listener thread with the message rendered but the
+# structured fields intact (the stock QueueHandler flattens them into text)
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        message = record.getMessage()
+        record = logging.makeLogRecord(record.__dict__)
+        for field, value in _bound.get().items():
+            if getattr(record, field, None) is None:
+                setattr(record, field, value)
+        record.msg = message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+# Route all logging through an in-memory queue drained by a background thread,
+# so handlers on the event loop never block on a slow stderr. LOG_FORMAT=text
+# keeps the old line format. Returns the listener; stop it on shutdown to flush.
+def setup_logging(level: int = logging.INFO, fmt: Optional[str] = None) -> logging.handlers.QueueListener:
+    fmt = fmt or os.environ.get("LOG_FORMAT", "json")
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JSONFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_QueueHandler(log_queue))
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,290 @@
+import logging
+import math
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import discord
+
+import logs
+
+# Latency buckets in seconds, from sub-millisecond cache reads up to slow upstream calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._callback: Optional[Callable[[], Optional[float]]] = None
+
+    def set(self, value: float, **labels: str):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    # Read the value lazily at scrape time (label-less gauges only)
+    def set_function(self, callback: Callable[[], Optional[float]]):
+        self._callback = callback
+
+    def samples(self) -> List[str]:
+        if self._callback is not None:
+            value = self._callback()
+            if value is None or (isinstance(value, float) and math.isnan(value)):
+                return []
+            return [f"{self.name} {_format_value(value)}"]
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Per label set: [per-bucket counts..., sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0.0] * (len(self.buckets) + 1)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            counts[-1] += value
+
+    # Context manager timing a block into this histogram
+    def time(self, **labels: str) -> "_Timer":
+        return _Timer(self, labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts)) for key, counts in self._values.items()]
+        lines = []
+        for key, counts in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(cumulative)}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    # Prometheus text exposition format (version 0.0.4)
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in list(self._metrics.values())) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+command_latency = REGISTRY.register(Histogram(
+    "bot_command_latency_seconds", "Time from interaction receipt to command completion", ["command"]))
+command_errors = REGISTRY.register(Counter(
+    "bot_command_errors_total", "Slash commands that raised an unhandled error", ["command"]))
+defer_to_followup = REGISTRY.register(Histogram(
+    "bot_command_defer_to_followup_seconds", "Time between deferring and the command finishing", ["command"]))
+autocomplete_latency = REGISTRY.register(Histogram(
+    "bot_autocomplete_latency_seconds", "Autocomplete handler latency", ["command"]))
+ctftime_latency = REGISTRY.register(Histogram(
+    "bot_ctftime_request_seconds", "CTFtime API request latency per attempt", ["endpoint"]))
+ctftime_responses = REGISTRY.register(Counter(
+    "bot_ctftime_responses_total", "CTFtime API responses by status (0 = network error)", ["endpoint", "status"]))
+cache_requests = REGISTRY.register(Counter(
+    "bot_cache_requests_total", "Cache lookups by cache and result (hit, stale, miss, revalidated)", ["cache", "result"]))
+rate_limits = REGISTRY.register(Counter(
+    "bot_discord_rate_limits_total", "Discord 429 responses by route", ["route"]))
+global_rate_limits = REGISTRY.register(Counter(
+    "bot_discord_global_rate_limits_total", "Discord 429 responses that were global (also counted by route)"))
+command_throttled = REGISTRY.register(Counter(
+    "bot_command_throttled_total", "Slash commands refused by a per-user or per-guild cooldown", ["command", "scope"]))
+coalesced_requests = REGISTRY.register(Counter(
+    "bot_coalesced_requests_total", "Calls that joined an identical in-flight request instead of issuing one", ["kind"]))
+gateway_latency = REGISTRY.register(Gauge(
+    "bot_gateway_latency_seconds", "Discord gateway heartbeat latency"))
+
+command_log = logging.getLogger("bot.commands")
+
+_SNOWFLAKE = re.compile(r"/\d{2,}")
+
+
+# Collapse ids in a path so each route is one label value
+def route_label(path: str) -> str:
+    return _SNOWFLAKE.sub("/{id}", path.split("?", 1)[0])
+
+
+# Counts the 429s that discord.py's HTTP client logs before it retries. A
+# global 429 logs the per-route message and then a "Global rate limit" one;
+# the route sample already counted it, so the follow-up only marks it global.
+class RateLimitLogHandler(logging.Handler):
+    def emit(self, record: logging.LogRecord):
+        message = str(record.msg)
+        if "Global rate limit" in message:
+            global_rate_limits.inc()
+            return
+        if "rate limited" not in message or not record.args or len(record.args) < 2:
+            return
+        method, url = record.args[0], str(record.args[1])
+        path = url.split("/api/v", 1)[-1].split("/", 1)[-1] if "/api/v" in url else url
+        rate_limits.inc(route=f"{method} /{route_label(path)}")
+
+
+# Wire the client-level metrics: gateway latency and Discord rate-limit hits
+def install(client: discord.Client):
+    gateway_latency.set_function(lambda: client.latency)
+    logging.getLogger("discord.http").addHandler(RateLimitLogHandler())
+
+
+def _command_name(interaction: discord.Interaction) -> str:
+    command = interaction.command
+    return command.qualified_name if command is not None else "unknown"
+
+
+# Structured log fields identifying a command invocation
+def command_fields(interaction: discord.Interaction) -> Dict[str, Any]:
+    return {"command": _command_name(interaction), "guild": interaction.guild_id, "user": interaction.user.id}
+
+
+# Call at the start of every command (CommandTree.interaction_check). Anything
+# logged while handling it carries the command, guild and user.
+def command_started(interaction: discord.Interaction):
+    interaction.extras["metrics_started"] = time.perf_counter()
+    logs.bind(**command_fields(interaction))
+
+
+# Defer an interaction and remember when, for the defer-to-followup histogram
+async def defer(interaction: discord.Interaction, **kwargs):
+    interaction.extras["metrics_deferred"] = time.perf_counter()
+    await interaction.response.defer(**kwargs)
+
+
+def command_finished(interaction: discord.Interaction, failed: bool = False):
+    now = time.perf_counter()
+    name = _command_name(interaction)
+    started = interaction.extras.get("metrics_started")
+    latency = None
+    if started is not None:
+        latency = now - started
+        command_latency.observe(latency, command=name)
+    deferred = interaction.extras.get("metrics_deferred")
+    if deferred is not None:
+        defer_to_followup.observe(now - deferred, command=name)
+    if failed:
+        command_errors.inc(command=name)
+    command_log.info(
+        f"/{name} {'failed' if failed else 'completed'}",
+        extra={
+            **command_fields(interaction),
+            "latency_ms": round(latency * 1000, 1) if latency is not None else None,
+            "status": "error" if failed else "ok",
+        },
+    )
+
+
+# Log an error raised while handling a command, with its traceback
+def command_error(interaction: discord.Interaction, error: BaseException, context: str = "failed"):
+    command_log.error(
+        f"/{_command_name(interaction)} {context}: {error}",
+        exc_info=error,
+        extra={**command_fields(interaction), "error": type(error).__name__},
+    )
+
+
+# A command refused by a cooldown; counted apart from errors and latency
+def command_rate_limited(interaction: discord.Interaction, scope: str):
+    command_throttled.inc(command=_command_name(interaction), scope=scope)
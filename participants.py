@@ -0,0 +1,112 @@
+from typing import AsyncIterator, List, Optional
+
+import discord
+
+# Stay well under Discord's 2000-character message limit
+PAGE_CHAR_LIMIT = 1800
+PAGE_LINE_LIMIT = 25
+
+
+def format_participant(member: discord.abc.User) -> str:
+    return f"> **{member.display_name}** ({member.name})"
+
+
+# Participants from the member cache: everyone holding the CTF role
+async def role_participants(role: discord.Role) -> AsyncIterator[str]:
+    for member in sorted(role.members, key=lambda m: m.display_name.casefold()):
+        if not member.bot:
+            yield format_participant(member)
+
+
+# Fallback for channels without a usable role: page through the 👍 reactions,
+# yielding each user as soon as its page of results arrives
+async def reaction_participants(message: discord.Message) -> AsyncIterator[str]:
+    for reaction in message.reactions:
+        if str(reaction.emoji) == "👍":
+            async for user in reaction.users():
+                if not user.bot:  # Exclude the bot itself
+                    yield format_participant(user)
+            break  # We only care about the 👍 reaction
+
+
+# Paginated participant list that pulls from its source only as far as the
+# pages being viewed, so the first page is shown without reading the rest
+class ParticipantPager(discord.ui.View):
+    def __init__(self, title: str, source: AsyncIterator[str], total: Optional[int] = None, timeout: float = 300):
+        super().__init__(timeout=timeout)
+        self.header = f"> # **{title}**\n> ## Participants:\n"
+        self.source = source
+        self.total = total
+        self.pages: List[List[str]] = []
+        self.index = 0
+        self._pending: Optional[str] = None  # Line read ahead that didn't fit the last page
+        self._exhausted = False
+
+    async def _next_line(self) -> Optional[str]:
+        if self._pending is not None:
+            line, self._pending = self._pending, None
+            return line
+        if self._exhausted:
+            return None
+        try:
+            return await self.source.__anext__()
+        except StopAsyncIteration:
+            self._exhausted = True
+            return None
+
+    # Read lines until page `index` exists and we know whether another follows it
+    async def _fill(self, index: int):
+        while len(self.pages) <= index:
+            page: List[str] = []
+            size = len(self.header)
+            while len(page) < PAGE_LINE_LIMIT:
+                line = await self._next_line()
+                if line is None:
+                    break
+                if page and size + len(line) + 1 > PAGE_CHAR_LIMIT:
+                    self._pending = line
+                    break
+                page.append(line)
+                size += len(line) + 1
+            if not page:
+                return
+            self.pages.append(page)
+        if self._pending is None and not self._exhausted:
+            self._pending = await self._next_line()
+
+    def _has_next(self) -> bool:
+        return self.index + 1 < len(self.pages) or self._pending is not None
+
+    def render(self) -> str:
+        if not self.pages:
+            return self.header.rstrip("\n")
+        footer = f"Page {self.index + 1}"
+        if self.total is not None:
+            footer += f" · {self.total} participants"
+        elif self._has_next():
+            footer += " · more…"
+        return self.header + "\n".join(self.pages[self.index]) + f"\n-# {footer}"
+
+    def _update_buttons(self):
+        self.previous_page.disabled = self.index == 0
+        self.next_page.disabled = not self._has_next()
+
+    # Load the first page; returns False when there are no participants at all
+    async def prepare(self) -> bool:
+        await self._fill(0)
+        self._update_buttons()
+        return bool(self.pages)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.index = max(self.index - 1, 0)
+        self._update_buttons()
+        await interaction.response.edit_message(content=self.render(), view=self)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._fill(self.index + 1)
+        if self.index + 1 < len(self.pages):
+            self.index += 1
+        self._update_buttons()
+        await interaction.response.edit_message(content=self.render(), view=self)
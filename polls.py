@@ -0,0 +1,165 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set
+
+import discord
+
+from storage import Storage
+
+VOTES_COLLECTION = "votes"
+YES = "✅"
+NO = "❌"
+POLL_TEXT = """🗳️ Should we play **{name}**?
+{url}
+React with {yes} or {no}."""
+
+
+# One poll's tallies. Voters are kept by id so a vote is an O(1) set/dict
+# update and switching sides never double-counts.
+class Poll:
+    __slots__ = ("event_id", "message_id", "name", "url", "yes", "no")
+
+    def __init__(self, event_id: str, message_id: int, name: str, url: str):
+        self.event_id = event_id
+        self.message_id = message_id
+        self.name = name
+        self.url = url
+        self.yes: Dict[int, Dict[str, Any]] = {}  # user id -> participant entry
+        self.no: Set[int] = set()
+
+    # Same shape as votes.json, plus the ids of the "no" voters
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "poll_id": self.message_id,
+            "name": self.name,
+            "url": self.url,
+            "votesyes": len(self.yes),
+            "votesno": len(self.no),
+            "participants": list(self.yes.values()),
+            "no_voters": sorted(self.no),
+        }
+
+    @classmethod
+    def from_dict(cls, event_id: str, data: Dict[str, Any]) -> "Poll":
+        poll = cls(event_id, int(data["poll_id"]), data.get("name", ""), data.get("url", ""))
+        for participant in data.get("participants", []):
+            poll.yes[int(participant["id"])] = participant
+        poll.no = {int(user_id) for user_id in data.get("no_voters", [])}
+        return poll
+
+
+# Yes/no polls on CTFtime events. Reactions update in-memory counters and mark
+# the poll dirty; a background task writes the dirty polls in one storage
+# batch every flush_interval seconds.
+class PollEngine:
+    def __init__(self, storage: Storage, flush_interval: float = 15.0):
+        self.storage = storage
+        self.flush_interval = flush_interval
+        self._polls: Dict[str, Poll] = {}
+        self._by_message: Dict[int, Poll] = {}
+        self._dirty: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._polls)
+
+    def _index(self, poll: Poll):
+        previous = self._polls.get(poll.event_id)
+        if previous is not None:
+            self._by_message.pop(previous.message_id, None)
+        self._polls[poll.event_id] = poll
+        self._by_message[poll.message_id] = poll
+
+    async def load(self):
+        votes = await self.storage.load_votes()
+        self._polls.clear()
+        self._by_message.clear()
+        for event_id, data in votes.items():
+            try:
+                self._index(Poll.from_dict(str(event_id), data))
+            except (KeyError, TypeError, ValueError) as e:
+                logging.error(f"Skipping malformed poll {event_id}: {str(e)}")
+        logging.info(f"Loaded {len(self._polls)} polls")
+
+    def get(self, event_id: Any) -> Optional[Poll]:
+        return self._polls.get(str(event_id))
+
+    def is_poll(self, message_id: int) -> bool:
+        return message_id in self._by_message
+
+    # Post a poll for a CTFtime event. Re-polling an event moves it to the new
+    # message and keeps the votes already cast.
+    async def post(self, channel: discord.abc.Messageable, event: Dict[str, Any]) -> Poll:
+        message = await channel.send(POLL_TEXT.format(name=event["title"], url=event["url"], yes=YES, no=NO))
+        await asyncio.gather(message.add_reaction(YES), message.add_reaction(NO))
+
+        event_id = str(event["id"])
+        poll = Poll(event_id, message.id, event["title"], event["url"])
+        previous = self._polls.get(event_id)
+        if previous is not None:
+            poll.yes, poll.no = previous.yes, previous.no
+        self._index(poll)
+        # Written straight away so a restart can't lose the message mapping
+        await self.storage.put(VOTES_COLLECTION, event_id, poll.to_dict())
+        self._dirty.discard(event_id)
+        return poll
+
+    # Apply one reaction; returns False when the message isn't a poll
+    def react(self, message_id: int, user_id: int, emoji: str, added: bool,
+              member: Optional[discord.Member] = None) -> bool:
+        poll = self._by_message.get(message_id)
+        if poll is None:
+            return False
+        if emoji == YES:
+            if added:
+                poll.no.discard(user_id)
+                poll.yes[user_id] = {
+                    "id": user_id,
+                    "username": member.name if member else str(user_id),
+                    "displayname": member.display_name if member else str(user_id),
+                }
+            else:
+                poll.yes.pop(user_id, None)
+        elif emoji == NO:
+            if added:
+                poll.yes.pop(user_id, None)
+                poll.no.add(user_id)
+            else:
+                poll.no.discard(user_id)
+        else:
+            return True
+        self._dirty.add(poll.event_id)
+        return True
+
+    async def flush(self):
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        operations = [
+            ("put", VOTES_COLLECTION, event_id, self._polls[event_id].to_dict())
+            for event_id in dirty if event_id in self._polls
+        ]
+        try:
+            await self.storage.batch(operations)
+        except Exception as e:
+            self._dirty |= dirty  # Retry on the next flush
+            logging.error(f"Error saving votes: {str(e)}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    # Polls ordered by yes votes, for the results command
+    def standings(self) -> List[Poll]:
+        return sorted(self._polls.values(), key=lambda poll: len(poll.yes), reverse=True)
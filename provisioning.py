@@ -0,0 +1,172 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple
+
+import discord
+
+from registry import AnnouncementRecord, ChannelRegistry
+from storage import Storage
+
+CTF_CATEGORY = "CTF Competition"
+ANNOUNCEMENT_TEXT = """🏁 New CTF: **{ctf_name}** is now available!
+React with 👍 to gain access."""
+
+Progress = Callable[[str], Awaitable[None]]
+
+
+class ProvisioningError(Exception):
+    pass
+
+
+# Everything created for one CTF, so a failure can be rolled back
+class ProvisionResult:
+    __slots__ = ("ctf_name", "category", "role", "channel", "messages", "records",
+                 "created_category", "created_role")
+
+    def __init__(self, ctf_name: str):
+        self.ctf_name = ctf_name
+        self.category: Optional[discord.CategoryChannel] = None
+        self.role: Optional[discord.Role] = None
+        self.channel: Optional[discord.TextChannel] = None
+        self.messages: List[discord.Message] = []
+        self.records: List[AnnouncementRecord] = []
+        self.created_category = False
+        self.created_role = False
+
+
+async def get_or_create_category(guild: discord.Guild, name: str = CTF_CATEGORY) -> Tuple[discord.CategoryChannel, bool]:
+    category = discord.utils.get(guild.categories, name=name)
+    if category:
+        return category, False
+    return await guild.create_category(name), True
+
+
+async def _get_or_create_role(guild: discord.Guild, ctf_name: str) -> Tuple[discord.Role, bool]:
+    role = discord.utils.get(guild.roles, name=f"CTF-{ctf_name}")
+    if role:
+        return role, False
+    return await guild.create_role(name=f"CTF-{ctf_name}"), True
+
+
+# Post one announcement; the reaction and the registry write run side by side
+async def _announce(
+    result: ProvisionResult,
+    announcement_channel: discord.TextChannel,
+    registry: ChannelRegistry,
+    storage: Storage,
+):
+    message = await announcement_channel.send(ANNOUNCEMENT_TEXT.format(ctf_name=result.ctf_name))
+    result.messages.append(message)
+    record = registry.add(AnnouncementRecord(
+        message.id, result.channel.id, result.role.id, result.ctf_name, announcement_channel.id
+    ))
+    result.records.append(record)
+    await asyncio.gather(message.add_reaction("👍"), storage.upsert_announcements([record]))
+
+
+# Best effort: a failed DM never fails (or rolls back) the provisioning run
+async def _dm(user: discord.abc.User, ctf_name: str):
+    try:
+        await user.send(f"✅ New channel created: **{ctf_name}**")
+    except discord.Forbidden:
+        pass  # Unable to DM user
+    except Exception as e:
+        logging.error(f"Error sending provisioning DM for {ctf_name}: {str(e)}", extra={"user": user.id})
+
+
+async def _delete_quietly(obj):
+    try:
+        await obj.delete()
+    except discord.NotFound:
+        pass
+    except Exception as e:
+        logging.error(f"Error rolling back {obj!r}: {str(e)}")
+
+
+# Undo whatever a failed provisioning run managed to create
+async def rollback(result: ProvisionResult, registry: ChannelRegistry, storage: Storage):
+    message_ids = [record.message_id for record in result.records]
+    for message_id in message_ids:
+        registry.remove(message_id)
+
+    cleanup = [_delete_quietly(message) for message in result.messages]
+    if result.channel is not None:
+        cleanup.append(_delete_quietly(result.channel))
+    if result.created_role and result.role is not None:
+        cleanup.append(_delete_quietly(result.role))
+    await asyncio.gather(*cleanup)
+
+    # The category may be shared with other CTFs; only remove it if we made it and it is empty
+    if result.created_category and result.category is not None and not result.category.channels:
+        await _delete_quietly(result.category)
+    try:
+        await storage.delete_announcements(message_ids)
+    except Exception as e:
+        logging.error(f"Error rolling back channel messages: {str(e)}")
+
+
+# Create the role, channel and announcements for one CTF. Independent steps run
+# concurrently; on failure everything created here is removed again.
+async def provision_ctf(
+    guild: discord.Guild,
+    ctf_name: str,
+    announcement_channels: Sequence[discord.TextChannel],
+    registry: ChannelRegistry,
+    storage: Storage,
+    user: Optional[discord.abc.User] = None,
+    category: Optional[discord.CategoryChannel] = None,
+    progress: Optional[Progress] = None,
+    category_name: str = CTF_CATEGORY,
+) -> ProvisionResult:
+    result = ProvisionResult(ctf_name)
+
+    async def report(message: str):
+        if progress is not None:
+            try:
+                await progress(message)
+            except Exception as e:
+                logging.error(f"Error reporting provisioning progress: {str(e)}", extra={"guild": guild.id})
+
+    try:
+        # Category and role don't depend on each other. Record whichever succeeded
+        # before re-raising, so rollback sees both.
+        if category is None:
+            category_outcome, role_outcome = await asyncio.gather(
+                get_or_create_category(guild, category_name), _get_or_create_role(guild, ctf_name),
+                return_exceptions=True,
+            )
+            if not isinstance(category_outcome, BaseException):
+                result.category, result.created_category = category_outcome
+            if not isinstance(role_outcome, BaseException):
+                result.role, result.created_role = role_outcome
+            for outcome in (category_outcome, role_outcome):
+                if isinstance(outcome, BaseException):
+                    raise outcome
+            category = result.category
+        else:
+            result.category = category
+            result.role, result.created_role = await _get_or_create_role(guild, ctf_name)
+
+        overwrites = {
+            guild.default_role: discord.PermissionOverwrite(read_messages=False),
+            result.role: discord.PermissionOverwrite(read_messages=True),
+            guild.me: discord.PermissionOverwrite(read_messages=True)
+        }
+        result.channel = await guild.create_text_channel(ctf_name, category=category, overwrites=overwrites)
+        await report(f"⏳ **{ctf_name}**: created {result.channel.mention}, posting announcements…")
+
+        outcomes = await asyncio.gather(
+            *(_announce(result, channel, registry, storage) for channel in announcement_channels),
+            return_exceptions=True,
+        )
+        errors = [outcome for outcome in outcomes if isinstance(outcome, BaseException)]
+        if errors:
+            raise ProvisioningError(f"Failed to announce **{ctf_name}**: {errors[0]}") from errors[0]
+    except BaseException:
+        await rollback(result, registry, storage)
+        raise
+
+    # Only once nothing can be rolled back any more
+    if user is not None:
+        await _dm(user, ctf_name)
+    return result
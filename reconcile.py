@@ -0,0 +1,164 @@
+import asyncio
+import logging
+from typing import Callable, Dict, Iterable, List, Optional
+
+import discord
+
+from bulk import ARCHIVE_CATEGORY
+from registry import AnnouncementRecord, ChannelRegistry
+from roles import RoleGrantQueue
+from storage import Storage
+
+JOIN_EMOJI = "👍"
+
+# Announcement channel ids to search for records that didn't store theirs
+ChannelCandidates = Callable[[discord.Guild], Iterable[int]]
+
+
+class ReconcileReport:
+    __slots__ = ("checked", "dropped", "repointed", "archived", "scanned", "granted", "errors")
+
+    def __init__(self):
+        self.checked = 0
+        self.dropped: List[int] = []
+        self.repointed = 0
+        self.archived = 0
+        self.scanned = 0
+        self.granted = 0
+        self.errors = 0
+
+    def __str__(self) -> str:
+        return (f"checked {self.checked} announcements: {len(self.dropped)} dropped, "
+                f"{self.repointed} repointed, {self.archived} archived skipped, "
+                f"{self.scanned} announcement channels scanned, {self.granted} role grants queued, "
+                f"{self.errors} errors")
+
+
+def _in_archive(channel: discord.TextChannel) -> bool:
+    return channel.category is not None and channel.category.name == ARCHIVE_CATEGORY
+
+
+# Brings channel_messages back in line with the guild state after downtime.
+# Channels and roles are checked against the gateway cache with no REST calls,
+# and the corrected registry is written back in one transaction. Then each
+# announcement channel is read once with history() (100 messages per call,
+# reaction counts included), a few channels at a time, to grant roles for 👍
+# reactions added while the bot was offline. CTF channels already archived are
+# skipped. Removals missed offline are left alone, so roles granted by hand
+# aren't stripped.
+class Reconciler:
+    def __init__(
+        self,
+        client: discord.Client,
+        registry: ChannelRegistry,
+        storage: Storage,
+        role_grants: RoleGrantQueue,
+        candidates: Optional[ChannelCandidates] = None,
+        archived: Callable[[discord.TextChannel], bool] = _in_archive,
+        concurrency: int = 5,
+    ):
+        self.client = client
+        self.registry = registry
+        self.storage = storage
+        self.role_grants = role_grants
+        self.candidates = candidates
+        self.archived = archived
+        self.limit = asyncio.Semaphore(concurrency)
+        self.report = ReconcileReport()
+
+    # Any guild still unavailable means a missing channel may just not be cached yet
+    def _cache_complete(self) -> bool:
+        return not any(guild.unavailable for guild in self.client.guilds)
+
+    # Validate one record from the cache; returns the (possibly repointed) record or None to drop it
+    def _validate(self, record: AnnouncementRecord, cache_complete: bool) -> Optional[AnnouncementRecord]:
+        channel = self.client.get_channel(record.channel_id)
+        if channel is None:
+            announcement = self.client.get_channel(record.announcement_channel_id or 0)
+            if announcement is None and not cache_complete:
+                return record  # Can't tell yet; keep it
+            return None
+
+        guild = channel.guild
+        if guild.get_role(record.role_id) is not None:
+            return record
+        role = discord.utils.get(guild.roles, name=f"CTF-{channel.name}")
+        if role is None:
+            return None
+        self.report.repointed += 1
+        return AnnouncementRecord(
+            record.message_id, record.channel_id, role.id, record.ctf_name,
+            record.announcement_channel_id, record.created_at,
+        )
+
+    async def _sync_message(self, record: AnnouncementRecord, message: discord.Message):
+        role = message.guild.get_role(record.role_id) if message.guild else None
+        reaction = discord.utils.find(lambda r: str(r.emoji) == JOIN_EMOJI, message.reactions)
+        if role is None or reaction is None:
+            return
+        if reaction.count - int(reaction.me) == 0:
+            return  # Only the bot's own 👍
+        holders = {member.id for member in role.members}
+        async for user in reaction.users():
+            if not user.bot and user.id not in holders:
+                self.role_grants.submit(message.guild.id, user.id, role.id, True)
+                self.report.granted += 1
+
+    # One pass over an announcement channel, from its oldest recorded message up
+    async def _scan_channel(self, channel: discord.TextChannel, records: Dict[int, AnnouncementRecord]):
+        newest = max(records)
+        async with self.limit:
+            try:
+                async for message in channel.history(
+                    limit=None, after=discord.Object(id=min(records) - 1), oldest_first=True
+                ):
+                    if message.id > newest:
+                        break
+                    record = records.get(message.id)
+                    if record is not None:
+                        await self._sync_message(record, message)
+                self.report.scanned += 1
+            except discord.HTTPException as e:
+                self.report.errors += 1
+                logging.error(f"Error reading announcements in {channel.id}: {str(e)}")
+
+    async def run(self) -> ReconcileReport:
+        # Fix the live registry in one synchronous pass, so nothing added
+        # concurrently can be lost by the write that follows
+        cache_complete = self._cache_complete()
+        for record in self.registry:
+            self.report.checked += 1
+            valid = self._validate(record, cache_complete)
+            if valid is None:
+                self.registry.remove(record.message_id)
+                self.report.dropped.append(record.message_id)
+            elif valid is not record:
+                self.registry.add(valid)
+        if self.report.dropped or self.report.repointed:
+            await self.storage.replace_announcements(self.registry)
+
+        # Group the live, unarchived records by the announcement channel to read
+        by_channel: Dict[int, Dict[int, AnnouncementRecord]] = {}
+        for record in self.registry:
+            channel = self.client.get_channel(record.channel_id)
+            if channel is None:
+                continue
+            if self.archived(channel):
+                self.report.archived += 1
+                continue
+            if record.announcement_channel_id:
+                channel_ids: Iterable[int] = [record.announcement_channel_id]
+            elif self.candidates is not None:
+                channel_ids = self.candidates(channel.guild)
+            else:
+                channel_ids = []
+            for channel_id in channel_ids:
+                by_channel.setdefault(channel_id, {})[record.message_id] = record
+
+        scans = []
+        for channel_id, records in by_channel.items():
+            channel = self.client.get_channel(channel_id)
+            if channel is not None:
+                scans.append(self._scan_channel(channel, records))
+        await asyncio.gather(*scans)
+        return self.report
@@ -0,0 +1,117 @@
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+
+# One CTF announcement message and the channel/role it grants access to
+class AnnouncementRecord:
+    __slots__ = (
+        "message_id", "channel_id", "role_id", "ctf_name",
+        "announcement_channel_id", "created_at", "updated_at",
+    )
+
+    def __init__(
+        self,
+        message_id: int,
+        channel_id: int,
+        role_id: int,
+        ctf_name: Optional[str] = None,
+        announcement_channel_id: Optional[int] = None,
+        created_at: Optional[float] = None,
+        updated_at: Optional[float] = None,
+    ):
+        now = time.time()
+        self.message_id = int(message_id)
+        self.channel_id = int(channel_id)
+        self.role_id = int(role_id)
+        self.ctf_name = ctf_name
+        self.announcement_channel_id = int(announcement_channel_id) if announcement_channel_id else None
+        self.created_at = created_at if created_at is not None else now
+        self.updated_at = updated_at if updated_at is not None else self.created_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "channel_id": self.channel_id,
+            "role_id": self.role_id,
+            "ctf_name": self.ctf_name,
+            "announcement_channel_id": self.announcement_channel_id,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+    @classmethod
+    def from_dict(cls, message_id: Any, data: Dict[str, Any]) -> "AnnouncementRecord":
+        return cls(
+            int(message_id),
+            data["channel_id"],
+            data["role_id"],
+            data.get("ctf_name"),
+            data.get("announcement_channel_id"),
+            data.get("created_at"),
+            data.get("updated_at"),
+        )
+
+    def __repr__(self) -> str:
+        return (f"AnnouncementRecord(message_id={self.message_id}, channel_id={self.channel_id}, "
+                f"role_id={self.role_id}, ctf_name={self.ctf_name!r})")
+
+
+# Announcement messages keyed by int message id, with reverse indexes by
+# CTF channel id and role id
+class ChannelRegistry:
+    def __init__(self):
+        self._by_message: Dict[int, AnnouncementRecord] = {}
+        self._by_channel: Dict[int, Dict[int, None]] = {}
+        self._by_role: Dict[int, Dict[int, None]] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_message)
+
+    def __contains__(self, message_id: int) -> bool:
+        return message_id in self._by_message
+
+    def __iter__(self) -> Iterator[AnnouncementRecord]:
+        return iter(list(self._by_message.values()))
+
+    def get(self, message_id: int) -> Optional[AnnouncementRecord]:
+        return self._by_message.get(message_id)
+
+    def add(self, record: AnnouncementRecord) -> AnnouncementRecord:
+        existing = self._by_message.get(record.message_id)
+        if existing is not None:
+            self._unindex(existing)
+            record.created_at = existing.created_at
+            record.updated_at = time.time()
+        self._by_message[record.message_id] = record
+        self._by_channel.setdefault(record.channel_id, {})[record.message_id] = None
+        self._by_role.setdefault(record.role_id, {})[record.message_id] = None
+        return record
+
+    def remove(self, message_id: int) -> Optional[AnnouncementRecord]:
+        record = self._by_message.pop(message_id, None)
+        if record is not None:
+            self._unindex(record)
+        return record
+
+    def _unindex(self, record: AnnouncementRecord):
+        for index, key in ((self._by_channel, record.channel_id), (self._by_role, record.role_id)):
+            bucket = index.get(key)
+            if bucket is not None:
+                bucket.pop(record.message_id, None)
+                if not bucket:
+                    del index[key]
+
+    def by_channel(self, channel_id: int) -> List[AnnouncementRecord]:
+        return [self._by_message[m] for m in self._by_channel.get(channel_id, ())]
+
+    def by_role(self, role_id: int) -> List[AnnouncementRecord]:
+        return [self._by_message[m] for m in self._by_role.get(role_id, ())]
+
+    def to_json(self) -> Dict[str, Dict[str, Any]]:
+        return {str(message_id): record.to_dict() for message_id, record in self._by_message.items()}
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Dict[str, Any]]) -> "ChannelRegistry":
+        registry = cls()
+        for message_id, item in data.items():
+            registry.add(AnnouncementRecord.from_dict(message_id, item))
+        return registry
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Tuple
+
+import discord
+
+GrantKey = Tuple[int, int, int]  # (guild_id, user_id, role_id)
+
+
+# Queue of role add/remove calls. Repeated events for the same member and role
+# collapse into one pending entry holding the latest desired state, so a
+# react/unreact burst costs at most one REST call.
+class RoleGrantQueue:
+    def __init__(self, client: discord.Client, workers: int = 2, reason: str = "CTF reaction role"):
+        self.client = client
+        self.workers = workers
+        self.reason = reason
+        self._pending: "OrderedDict[GrantKey, bool]" = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+        # Cleared while a worker sits out a 429 so the other workers wait too
+        self._not_limited = asyncio.Event()
+        self._not_limited.set()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def submit(self, guild_id: int, user_id: int, role_id: int, grant: bool):
+        key = (guild_id, user_id, role_id)
+        self._pending.pop(key, None)
+        self._pending[key] = grant
+        self._wakeup.set()
+
+    # Skip the REST call when the member cache already shows the desired state
+    def _already_applied(self, guild_id: int, user_id: int, role_id: int, grant: bool) -> bool:
+        guild = self.client.get_guild(guild_id)
+        member = guild.get_member(user_id) if guild else None
+        if member is None:
+            return False
+        return (member.get_role(role_id) is not None) == grant
+
+    async def _apply(self, key: GrantKey, grant: bool):
+        guild_id, user_id, role_id = key
+        if self._already_applied(guild_id, user_id, role_id, grant):
+            return
+        # Raw HTTP calls need neither the message nor the member in cache
+        if grant:
+            await self.client.http.add_role(guild_id, user_id, role_id, reason=self.reason)
+        else:
+            await self.client.http.remove_role(guild_id, user_id, role_id, reason=self.reason)
+
+    async def _worker(self):
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            await self._not_limited.wait()
+            if not self._pending:
+                continue
+
+            key, grant = self._pending.popitem(last=False)
+            try:
+                await self._apply(key, grant)
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    retry_after = getattr(e, "retry_after", None) or 1.0
+                    logging.warning(
+                        f"Rate limited applying role {key[2]}; backing off {retry_after}s",
+                        extra={"guild": key[0], "user": key[1], "status": 429},
+                    )
+                    if key not in self._pending:
+                        self._pending[key] = grant
+                    self._not_limited.clear()
+                    await asyncio.sleep(retry_after)
+                    self._not_limited.set()
+                elif e.status != 404:
+                    logging.error(
+                        f"Error updating role {key[2]} for user {key[1]}: {str(e)}",
+                        extra={"guild": key[0], "user": key[1], "status": e.status},
+                    )
+            except Exception as e:
+                logging.error(f"Error updating role {key[2]} for user {key[1]}: {str(e)}")
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
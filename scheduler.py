@@ -0,0 +1,136 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from storage import Storage
+
+JOBS_COLLECTION = "jobs"
+
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+# Awaited before the first job fires, e.g. until the handlers' caches are populated
+Ready = Callable[[], Awaitable[Any]]
+
+
+# Persistent timer queue. Every pending job lives in storage and in one
+# min-heap ordered by fire time; a single task sleeps until the earliest one.
+class Scheduler:
+    def __init__(self, storage: Storage, handlers: Optional[Dict[str, Handler]] = None, ready: Optional[Ready] = None):
+        self.storage = storage
+        self.handlers: Dict[str, Handler] = dict(handlers or {})
+        self.ready = ready
+        # kind -> seconds overdue after which a job reloaded on restart is dropped
+        self.expire_after: Dict[str, float] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._running = set()
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    # Jobs of a kind with `expire_after` are only worth running that late; older
+    # ones found on restart are discarded instead of fired
+    def register(self, kind: str, handler: Handler, expire_after: Optional[float] = None):
+        self.handlers[kind] = handler
+        if expire_after is not None:
+            self.expire_after[kind] = expire_after
+
+    def _push(self, job: Dict[str, Any]):
+        self._jobs[job["id"]] = job
+        heapq.heappush(self._heap, (job["fire_at"], next(self._seq), job["id"]))
+
+    # Reload pending jobs after a restart; overdue ones fire right away unless expired
+    async def load(self):
+        jobs = await self.storage.get_all(JOBS_COLLECTION)
+        self._heap.clear()
+        self._jobs.clear()
+        now = time.time()
+        expired = []
+        for job in jobs.values():
+            expire_after = self.expire_after.get(job["kind"])
+            if expire_after is not None and job["fire_at"] + expire_after < now:
+                expired.append(job["id"])
+            else:
+                self._push(job)
+        for job_id in expired:
+            await self.storage.delete(JOBS_COLLECTION, job_id)
+        self._wakeup.set()
+        logging.info(f"Loaded {len(self._jobs)} scheduled jobs, dropped {len(expired)} expired")
+
+    async def schedule(self, job_id: str, kind: str, fire_at: float, payload: Dict[str, Any]):
+        job = {"id": job_id, "kind": kind, "fire_at": fire_at, "payload": payload}
+        await self.storage.put(JOBS_COLLECTION, job_id, job)
+        self._push(job)
+        self._wakeup.set()
+
+    # Cancelled jobs are dropped from the index; their heap entries are skipped lazily
+    async def cancel(self, job_id: str):
+        if self._jobs.pop(job_id, None) is not None:
+            await self.storage.delete(JOBS_COLLECTION, job_id)
+
+    def pending(self) -> List[Dict[str, Any]]:
+        return sorted(self._jobs.values(), key=lambda job: job["fire_at"])
+
+    async def _fire(self, job: Dict[str, Any]):
+        handler = self.handlers.get(job["kind"])
+        try:
+            if handler is None:
+                logging.error(f"No handler for scheduled job kind {job['kind']}")
+            else:
+                await handler(job["payload"])
+        except Exception as e:
+            logging.error(f"Error running scheduled job {job['id']}: {str(e)}")
+        # Jobs run at most once, even if the handler failed
+        try:
+            await self.storage.delete(JOBS_COLLECTION, job["id"])
+        except Exception as e:
+            logging.error(f"Error removing scheduled job {job['id']}: {str(e)}")
+
+    async def _run(self):
+        if self.ready is not None:
+            await self.ready()
+        while True:
+            # Drop heap entries whose job was cancelled or replaced
+            while self._heap and self._heap[0][2] not in self._jobs:
+                heapq.heappop(self._heap)
+
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            fire_at, _, job_id = self._heap[0]
+            delay = fire_at - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            job = self._jobs.get(job_id)
+            if job is None or job["fire_at"] != fire_at:
+                continue  # Rescheduled under the same id; the newer entry is still queued
+            del self._jobs[job_id]
+            task = asyncio.create_task(self._fire(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
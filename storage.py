@@ -0,0 +1,379 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from registry import AnnouncementRecord, ChannelRegistry
+
+VOTES_FILE = "votes.json"
+CHANNEL_MESSAGES_FILE = "channel_messages.json"
+DATABASE_FILE = "bot.db"
+
+# A write in a batch: ("put", collection, key, data) or ("delete", collection, key, None)
+Operation = Tuple[str, str, str, Optional[Any]]
+
+
+# Storage backends hold JSON documents grouped into collections (votes, ...)
+# plus the announcement registry, and apply every write off the event loop.
+class Storage(ABC):
+    @abstractmethod
+    async def get_all(self, collection: str) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    async def batch(self, operations: Iterable[Operation]):
+        ...
+
+    @abstractmethod
+    async def load_announcements(self) -> ChannelRegistry:
+        ...
+
+    @abstractmethod
+    async def upsert_announcements(self, records: Iterable[AnnouncementRecord]):
+        ...
+
+    @abstractmethod
+    async def delete_announcements(self, message_ids: Iterable[int]):
+        ...
+
+    # Replace the whole announcement table in one transaction
+    @abstractmethod
+    async def replace_announcements(self, registry: ChannelRegistry):
+        ...
+
+    async def close(self):
+        pass
+
+    async def get(self, collection: str, key: Any) -> Optional[Any]:
+        return (await self.get_all(collection)).get(str(key))
+
+    async def put(self, collection: str, key: Any, data: Any):
+        await self.batch([("put", collection, str(key), data)])
+
+    async def delete(self, collection: str, key: Any):
+        await self.batch([("delete", collection, str(key), None)])
+
+    async def load_votes(self) -> Dict[str, Any]:
+        return await self.get_all("votes")
+
+    async def save_vote(self, event_id: Any, data: Dict[str, Any]):
+        await self.put("votes", event_id, data)
+
+    # Small bot-wide string settings (import markers, the command tree hash)
+    async def get_meta(self, key: str) -> Optional[str]:
+        return await self.get("meta", key)
+
+    async def put_meta(self, key: str, value: str):
+        await self.put("meta", key, value)
+
+
+# SQLite in WAL mode. One connection is owned by a single worker thread, so
+# writes are serialized without blocking the event loop.
+class SQLiteStorage(Storage):
+    def __init__(self, path: str = DATABASE_FILE):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage")
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS documents (
+                    collection TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (collection, key)
+                );
+                CREATE TABLE IF NOT EXISTS announcements (
+                    message_id INTEGER PRIMARY KEY,
+                    channel_id INTEGER NOT NULL,
+                    role_id INTEGER NOT NULL,
+                    ctf_name TEXT,
+                    announcement_channel_id INTEGER,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS announcements_channel ON announcements (channel_id);
+                CREATE INDEX IF NOT EXISTS announcements_role ON announcements (role_id);
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                );
+                """
+            )
+            self._conn = conn
+        return self._conn
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    # Run fn(conn) inside BEGIN IMMEDIATE ... COMMIT, rolling back on any error
+    def _transaction(self, fn, *args):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn, *args)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    def _get_all(self, collection: str) -> Dict[str, Any]:
+        rows = self._connect().execute(
+            "SELECT key, data FROM documents WHERE collection = ?", (collection,)
+        )
+        return {key: json.loads(data) for key, data in rows}
+
+    async def get_all(self, collection: str) -> Dict[str, Any]:
+        return await self._run(self._get_all, collection)
+
+    def _get(self, collection: str, key: str) -> Optional[Any]:
+        row = self._connect().execute(
+            "SELECT data FROM documents WHERE collection = ? AND key = ?", (collection, key)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    async def get(self, collection: str, key: Any) -> Optional[Any]:
+        return await self._run(self._get, collection, str(key))
+
+    @staticmethod
+    def _apply(conn: sqlite3.Connection, operations: List[Operation]):
+        now = time.time()
+        for op, collection, key, data in operations:
+            if op == "put":
+                conn.execute(
+                    "INSERT INTO documents (collection, key, data, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (collection, key) DO UPDATE SET data = excluded.data, "
+                    "updated_at = excluded.updated_at",
+                    (collection, key, json.dumps(data), now),
+                )
+            elif op == "delete":
+                conn.execute(
+                    "DELETE FROM documents WHERE collection = ? AND key = ?", (collection, key)
+                )
+            else:
+                raise ValueError(f"Unknown storage operation: {op}")
+
+    async def batch(self, operations: Iterable[Operation]):
+        operations = list(operations)
+        if operations:
+            await self._run(self._transaction, self._apply, operations)
+
+    def _load_announcements(self) -> ChannelRegistry:
+        registry = ChannelRegistry()
+        rows = self._connect().execute(
+            "SELECT message_id, channel_id, role_id, ctf_name, announcement_channel_id, "
+            "created_at, updated_at FROM announcements"
+        )
+        for row in rows:
+            registry.add(AnnouncementRecord(*row))
+        return registry
+
+    async def load_announcements(self) -> ChannelRegistry:
+        return await self._run(self._load_announcements)
+
+    @staticmethod
+    def _upsert_announcements(conn: sqlite3.Connection, records: List[AnnouncementRecord]):
+        conn.executemany(
+            "INSERT INTO announcements (message_id, channel_id, role_id, ctf_name, "
+            "announcement_channel_id, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (message_id) DO UPDATE SET channel_id = excluded.channel_id, "
+            "role_id = excluded.role_id, ctf_name = excluded.ctf_name, "
+            "announcement_channel_id = excluded.announcement_channel_id, "
+            "updated_at = excluded.updated_at",
+            [
+                (r.message_id, r.channel_id, r.role_id, r.ctf_name,
+                 r.announcement_channel_id, r.created_at, r.updated_at)
+                for r in records
+            ],
+        )
+
+    async def upsert_announcements(self, records: Iterable[AnnouncementRecord]):
+        records = list(records)
+        if records:
+            await self._run(self._transaction, self._upsert_announcements, records)
+
+    @staticmethod
+    def _delete_announcements(conn: sqlite3.Connection, message_ids: List[int]):
+        conn.executemany(
+            "DELETE FROM announcements WHERE message_id = ?", [(m,) for m in message_ids]
+        )
+
+    async def delete_announcements(self, message_ids: Iterable[int]):
+        message_ids = list(message_ids)
+        if message_ids:
+            await self._run(self._transaction, self._delete_announcements, message_ids)
+
+    @classmethod
+    def _replace_announcements(cls, conn: sqlite3.Connection, records: List[AnnouncementRecord]):
+        conn.execute("DELETE FROM announcements")
+        cls._upsert_announcements(conn, records)
+
+    async def replace_announcements(self, registry: ChannelRegistry):
+        await self._run(self._transaction, self._replace_announcements, list(registry))
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._connect().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    async def get_meta(self, key: str) -> Optional[str]:
+        return await self._run(self._get_meta, key)
+
+    @staticmethod
+    def _put_meta(conn: sqlite3.Connection, key: str, value: str):
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    async def put_meta(self, key: str, value: str):
+        await self._run(self._transaction, self._put_meta, key, value)
+
+    # Import the legacy JSON files once, in a single transaction
+    def _import_json(self, votes_path: str, channel_messages_path: str) -> Tuple[int, int]:
+        if self._get_meta("json_imported"):
+            return 0, 0
+        votes = _read_json(votes_path)
+        registry = ChannelRegistry.from_json(_read_json(channel_messages_path))
+
+        def run(conn: sqlite3.Connection):
+            self._apply(conn, [("put", "votes", str(k), v) for k, v in votes.items()])
+            self._upsert_announcements(conn, list(registry))
+            self._put_meta(conn, "json_imported", str(time.time()))
+
+        self._transaction(run)
+        return len(votes), len(registry)
+
+    async def import_json(
+        self, votes_path: str = VOTES_FILE, channel_messages_path: str = CHANNEL_MESSAGES_FILE
+    ) -> Tuple[int, int]:
+        return await self._run(self._import_json, votes_path, channel_messages_path)
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def close(self):
+        await self._run(self._close)
+        self._executor.shutdown(wait=False)
+
+
+def _read_json(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, "r") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+    except json.JSONDecodeError as e:
+        logging.error(f"Error reading {path}: {str(e)}")
+        return {}
+
+
+# Write to a temp file and rename over the target so a crash never truncates it
+def _write_json_atomic(path: str, data: Any):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(data, file, indent=4)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+# The original one-file-per-collection layout (votes.json, channel_messages.json),
+# kept for deployments without SQLite. Writes are whole-file but atomic.
+class JSONStorage(Storage):
+    def __init__(self, directory: str = "."):
+        self.directory = directory
+        self._lock = asyncio.Lock()
+
+    def _path(self, collection: str) -> str:
+        return os.path.join(self.directory, f"{collection}.json")
+
+    async def get_all(self, collection: str) -> Dict[str, Any]:
+        async with self._lock:
+            return await asyncio.to_thread(_read_json, self._path(collection))
+
+    def _apply(self, operations: List[Operation]):
+        documents: Dict[str, Dict[str, Any]] = {}
+        for op, collection, key, data in operations:
+            if collection not in documents:
+                documents[collection] = _read_json(self._path(collection))
+            if op == "put":
+                documents[collection][key] = data
+            elif op == "delete":
+                documents[collection].pop(key, None)
+            else:
+                raise ValueError(f"Unknown storage operation: {op}")
+        for collection, docs in documents.items():
+            _write_json_atomic(self._path(collection), docs)
+
+    async def batch(self, operations: Iterable[Operation]):
+        operations = list(operations)
+        if operations:
+            async with self._lock:
+                await asyncio.to_thread(self._apply, operations)
+
+    async def load_announcements(self) -> ChannelRegistry:
+        async with self._lock:
+            data = await asyncio.to_thread(_read_json, os.path.join(self.directory, CHANNEL_MESSAGES_FILE))
+        return ChannelRegistry.from_json(data)
+
+    def _update_announcements(self, upserts: List[AnnouncementRecord], deletes: List[int]):
+        path = os.path.join(self.directory, CHANNEL_MESSAGES_FILE)
+        registry = ChannelRegistry.from_json(_read_json(path))
+        for record in upserts:
+            registry.add(record)
+        for message_id in deletes:
+            registry.remove(message_id)
+        _write_json_atomic(path, registry.to_json())
+
+    async def upsert_announcements(self, records: Iterable[AnnouncementRecord]):
+        async with self._lock:
+            await asyncio.to_thread(self._update_announcements, list(records), [])
+
+    async def delete_announcements(self, message_ids: Iterable[int]):
+        async with self._lock:
+            await asyncio.to_thread(self._update_announcements, [], list(message_ids))
+
+    async def replace_announcements(self, registry: ChannelRegistry):
+        path = os.path.join(self.directory, CHANNEL_MESSAGES_FILE)
+        async with self._lock:
+            await asyncio.to_thread(_write_json_atomic, path, registry.to_json())
+
+
+_storage: Optional[Storage] = None
+
+
+# Process-wide storage, shared by every module so writes serialize in one place.
+# STORAGE_BACKEND=json keeps the legacy files; the default is SQLite.
+def get_storage() -> Storage:
+    global _storage
+    if _storage is None:
+        backend = os.environ.get("STORAGE_BACKEND", "sqlite").lower()
+        if backend == "json":
+            _storage = JSONStorage(os.environ.get("STORAGE_PATH", "."))
+        elif backend == "sqlite":
+            _storage = SQLiteStorage(os.environ.get("STORAGE_PATH", DATABASE_FILE))
+        else:
+            raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+    return _storage
+
+
+# Open the shared storage and bring in votes.json/channel_messages.json on first run
+async def open_storage() -> Storage:
+    storage = get_storage()
+    if isinstance(storage, SQLiteStorage):
+        votes, announcements = await storage.import_json()
+        if votes or announcements:
+            logging.info(f"Imported {votes} votes and {announcements} channel mappings into {storage.path}")
+    return storage
@@ -0,0 +1,331 @@
+import asyncio
+import hashlib
+import logging
+import re
+from datetime import datetime, timezone
+from html.parser import HTMLParser
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from ctftime import CTFTimeClient, CTFTimeError
+from storage import Storage
+
+TEAMS_COLLECTION = "tracked_teams"
+# The team page is parsed in slices so the scan can stop once the table is read
+PARSE_CHUNK = 16 * 1024
+
+# Posts one change to a channel; returns False when it could not be delivered
+Notify = Callable[[int, str], Awaitable[bool]]
+# Awaited before the first poll, e.g. until the channels to post to are cached
+Ready = Callable[[], Awaitable[Any]]
+
+_EVENT_HREF = re.compile(r"^/event/(\d+)")
+_RATING_PLACE = re.compile(r"Overall rating place:\s*([\d,]+)\s*with\s*([\d.]+)\s*pts", re.S)
+
+
+# One year of a team's CTFtime results
+class TeamStanding:
+    __slots__ = ("team_id", "year", "name", "rating_place", "rating_points", "results")
+
+    def __init__(self, team_id: int, year: int):
+        self.team_id = team_id
+        self.year = year
+        self.name = f"team {team_id}"
+        self.rating_place: Optional[int] = None
+        self.rating_points: Optional[float] = None
+        # event id -> {"event", "place", "points", "rating"}
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "year": self.year,
+            "name": self.name,
+            "rating_place": self.rating_place,
+            "rating_points": self.rating_points,
+            "results": self.results,
+        }
+
+    @classmethod
+    def from_dict(cls, team_id: int, data: Dict[str, Any]) -> "TeamStanding":
+        standing = cls(team_id, data["year"])
+        standing.name = data.get("name", standing.name)
+        standing.rating_place = data.get("rating_place")
+        standing.rating_points = data.get("rating_points")
+        standing.results = dict(data.get("results", {}))
+        return standing
+
+
+# Pulls the team name, the year's rating line and the year's results table out
+# of a CTFtime team page. Everything outside the rating_<year> tab is skipped
+# and no tree is built; `done` is set once the table has been read.
+class TeamPageParser(HTMLParser):
+    def __init__(self, standing: TeamStanding):
+        super().__init__(convert_charrefs=True)
+        self.standing = standing
+        self.done = False
+        self._named = False
+        self._in_title = False
+        self._in_tab = False
+        self._tab_text: List[str] = []
+        self._table_depth = 0
+        self._row: Optional[List[str]] = None
+        self._cell: Optional[List[str]] = None
+        self._event_id: Optional[str] = None
+
+    def handle_starttag(self, tag: str, attrs):
+        if self.done:
+            return
+        attrs = dict(attrs)
+        if tag == "h2" and not self._named:
+            self._in_title = True
+        elif tag == "div" and attrs.get("id") == f"rating_{self.standing.year}":
+            self._in_tab = True
+        elif not self._in_tab:
+            return
+        elif tag == "table":
+            self._table_depth += 1
+        elif self._table_depth and tag == "tr":
+            self._row, self._event_id = [], None
+        elif self._row is not None and tag == "td":
+            self._cell = []
+        elif self._cell is not None and tag == "a":
+            match = _EVENT_HREF.match(attrs.get("href") or "")
+            if match:
+                self._event_id = match.group(1)
+
+    def handle_endtag(self, tag: str):
+        if self.done:
+            return
+        if tag == "h2" and self._in_title:
+            self._in_title = False
+            self._named = True
+        elif not self._in_tab:
+            return
+        elif tag == "td" and self._cell is not None:
+            self._row.append("".join(self._cell).strip())
+            self._cell = None
+        elif tag == "tr" and self._row is not None:
+            self._add_row(self._row, self._event_id)
+            self._row = None
+        elif tag == "table" and self._table_depth:
+            self._table_depth -= 1
+            if not self._table_depth:
+                self.finish()
+
+    def handle_data(self, data: str):
+        if self.done:
+            return
+        if self._in_title and data.strip():
+            self.standing.name = data.strip()
+        elif self._cell is not None:
+            self._cell.append(data)
+        elif self._in_tab and not self._table_depth:
+            self._tab_text.append(data)
+
+    # Rows are: place icon, place, event, CTF points, rating points
+    def _add_row(self, cells: List[str], event_id: Optional[str]):
+        if event_id is None or len(cells) < 5:
+            return
+        self.standing.results[event_id] = {
+            "event": cells[2],
+            "place": _to_int(cells[1]),
+            "points": cells[3],
+            "rating": cells[4],
+        }
+
+    def finish(self):
+        match = _RATING_PLACE.search(" ".join(self._tab_text))
+        if match:
+            self.standing.rating_place = _to_int(match.group(1))
+            self.standing.rating_points = float(match.group(2))
+        self.done = True
+
+
+def _to_int(value: str) -> Optional[int]:
+    try:
+        return int(value.replace(",", "").strip())
+    except ValueError:
+        return None
+
+
+def parse_team_page(html: str, team_id: int, year: int) -> TeamStanding:
+    standing = TeamStanding(team_id, year)
+    parser = TeamPageParser(standing)
+    for start in range(0, len(html), PARSE_CHUNK):
+        parser.feed(html[start:start + PARSE_CHUNK])
+        if parser.done:
+            break
+    if not parser.done:
+        parser.finish()  # No results table yet this year; keep the rating line if any
+    return standing
+
+
+# Human-readable changes between two polls of the same team
+def diff_standings(old: TeamStanding, new: TeamStanding) -> List[str]:
+    changes = []
+    for event_id, result in new.results.items():
+        before = old.results.get(event_id)
+        if before is None:
+            changes.append(
+                f"🏁 **{new.name}** placed **#{result['place']}** in **{result['event']}** "
+                f"({result['points']} pts, {result['rating']} rating pts)"
+            )
+        elif before["place"] != result["place"] or before["rating"] != result["rating"]:
+            changes.append(
+                f"📝 **{new.name}** in **{result['event']}**: #{before['place']} → #{result['place']} "
+                f"({result['rating']} rating pts)"
+            )
+    if new.rating_place is not None and new.rating_place != old.rating_place:
+        arrow = "📈" if old.rating_place is None or new.rating_place < old.rating_place else "📉"
+        previous = f"#{old.rating_place} → " if old.rating_place is not None else ""
+        changes.append(
+            f"{arrow} **{new.name}** is now {previous}**#{new.rating_place}** "
+            f"in the {new.year} rating ({new.rating_points} pts)"
+        )
+    return changes
+
+
+class _Tracked:
+    __slots__ = ("team_id", "channel_ids", "etag", "last_modified", "digest", "standing")
+
+    def __init__(self, team_id: int):
+        self.team_id = team_id
+        self.channel_ids: Set[int] = set()
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.digest: Optional[str] = None
+        self.standing: Optional[TeamStanding] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "channel_ids": sorted(self.channel_ids),
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "digest": self.digest,
+            "standing": self.standing.to_dict() if self.standing else None,
+        }
+
+    @classmethod
+    def from_dict(cls, team_id: int, data: Dict[str, Any]) -> "_Tracked":
+        tracked = cls(team_id)
+        tracked.channel_ids = {int(c) for c in data.get("channel_ids", [])}
+        tracked.etag = data.get("etag")
+        tracked.last_modified = data.get("last_modified")
+        tracked.digest = data.get("digest")
+        if data.get("standing"):
+            tracked.standing = TeamStanding.from_dict(team_id, data["standing"])
+        return tracked
+
+
+# Follows CTFtime team pages and posts new placements and rating moves to the
+# channels tracking each team. Pages are fetched with conditional requests and
+# only re-parsed when their content changed; teams are polled one at a time
+# so several can share a short interval without bursting CTFtime. A team's
+# new standing is only saved once its changes were posted everywhere;
+# otherwise the next poll sees the same changes again.
+class TeamTracker:
+    def __init__(self, ctftime: CTFTimeClient, storage: Storage, notify: Notify,
+                 interval: float = 300.0, ready: Optional[Ready] = None):
+        self.ctftime = ctftime
+        self.storage = storage
+        self.notify = notify
+        self.interval = interval
+        self.ready = ready
+        self._teams: Dict[int, _Tracked] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._teams)
+
+    async def load(self):
+        stored = await self.storage.get_all(TEAMS_COLLECTION)
+        self._teams = {int(team_id): _Tracked.from_dict(int(team_id), data) for team_id, data in stored.items()}
+
+    def teams_for(self, channel_ids: Set[int]) -> List[int]:
+        return sorted(t.team_id for t in self._teams.values() if t.channel_ids & channel_ids)
+
+    async def _save(self, tracked: _Tracked):
+        await self.storage.put(TEAMS_COLLECTION, tracked.team_id, tracked.to_dict())
+
+    async def track(self, team_id: int, channel_id: int) -> Optional[TeamStanding]:
+        tracked = self._teams.get(team_id)
+        if tracked is None:
+            tracked = _Tracked(team_id)
+            await self.poll(tracked)  # Baseline; the current results aren't announced
+            self._teams[team_id] = tracked
+        tracked.channel_ids.add(channel_id)
+        await self._save(tracked)
+        return tracked.standing
+
+    async def untrack(self, team_id: int, channel_id: int) -> bool:
+        tracked = self._teams.get(team_id)
+        if tracked is None or channel_id not in tracked.channel_ids:
+            return False
+        tracked.channel_ids.discard(channel_id)
+        if tracked.channel_ids:
+            await self._save(tracked)
+        else:
+            del self._teams[team_id]
+            await self.storage.delete(TEAMS_COLLECTION, team_id)
+        return True
+
+    # Fetch one team page; returns the changes since the previous poll
+    async def poll(self, tracked: _Tracked) -> List[str]:
+        year = datetime.now(timezone.utc).year
+        html, tracked.etag, tracked.last_modified = await self.ctftime.get_page_conditional(
+            f"team/{tracked.team_id}", etag=tracked.etag, last_modified=tracked.last_modified
+        )
+        if html is None:
+            return []  # 304 Not Modified
+        digest = hashlib.sha256(html.encode()).hexdigest()
+        if digest == tracked.digest and tracked.standing is not None and tracked.standing.year == year:
+            return []
+        tracked.digest = digest
+
+        standing = parse_team_page(html, tracked.team_id, year)
+        previous = tracked.standing
+        tracked.standing = standing
+        if previous is None or previous.year != year:
+            return []  # First poll of the team (or of the year) only sets the baseline
+        return diff_standings(previous, standing)
+
+    async def _post(self, tracked: _Tracked, changes: List[str]) -> bool:
+        delivered = True
+        for change in changes:
+            for channel_id in list(tracked.channel_ids):
+                try:
+                    delivered = await self.notify(channel_id, change) and delivered
+                except Exception as e:
+                    logging.error(f"Error posting team update to {channel_id}: {str(e)}")
+                    delivered = False
+        return delivered
+
+    async def poll_all(self):
+        for tracked in list(self._teams.values()):
+            previous = (tracked.etag, tracked.last_modified, tracked.digest, tracked.standing)
+            try:
+                changes = await self.poll(tracked)
+                if not await self._post(tracked, changes):
+                    # Roll back so the undelivered changes are found again next poll
+                    tracked.etag, tracked.last_modified, tracked.digest, tracked.standing = previous
+                    continue
+                await self._save(tracked)
+            except CTFTimeError as e:
+                logging.error(f"Error polling CTFtime team {tracked.team_id}: {str(e)}")
+            except Exception as e:
+                logging.error(f"Error tracking CTFtime team {tracked.team_id}: {str(e)}")
+
+    async def _run(self):
+        if self.ready is not None:
+            await self.ready()
+        while True:
+            await self.poll_all()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,118 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+import discord
+from discord import app_commands
+
+import metrics
+
+# (burst size, seconds to refill the whole burst)
+Rate = Tuple[int, float]
+
+# Idle buckets are dropped once a limiter tracks more keys than this
+MAX_BUCKETS = 10000
+
+
+class TokenBucket:
+    __slots__ = ("capacity", "refill_rate", "tokens", "updated")
+
+    def __init__(self, capacity: int, per: float):
+        self.capacity = capacity
+        self.refill_rate = capacity / per
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+        self.updated = now
+
+    # Seconds until a token is available (0 when one is available now)
+    def retry_after(self, now: float) -> float:
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.refill_rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class RateLimited(app_commands.CheckFailure):
+    def __init__(self, scope: str, retry_after: float):
+        super().__init__(f"Rate limited ({scope}); retry in {retry_after:.1f}s")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+# Per-user and per-guild token buckets for one command. A call spends a token
+# from both, and only when both have one, so a throttled user doesn't drain
+# the guild's allowance.
+class Cooldowns:
+    def __init__(self, user: Rate, guild: Optional[Rate] = None):
+        self.rates: Dict[str, Rate] = {"user": user}
+        if guild is not None:
+            self.rates["guild"] = guild
+        self._buckets: Dict[Tuple[str, int], TokenBucket] = {}
+
+    def _bucket(self, scope: str, key: int, now: float) -> TokenBucket:
+        bucket = self._buckets.get((scope, key))
+        if bucket is None:
+            if len(self._buckets) >= MAX_BUCKETS:
+                self._buckets = {k: b for k, b in self._buckets.items() if not b.is_full(now)}
+            bucket = self._buckets[(scope, key)] = TokenBucket(*self.rates[scope])
+        return bucket
+
+    # Spend a token; raises RateLimited with the wait time instead when out of tokens
+    def hit(self, user_id: int, guild_id: Optional[int]):
+        now = time.monotonic()
+        buckets = [("user", self._bucket("user", user_id, now))]
+        if "guild" in self.rates and guild_id is not None:
+            buckets.append(("guild", self._bucket("guild", guild_id, now)))
+        for scope, bucket in buckets:
+            retry_after = bucket.retry_after(now)
+            if retry_after > 0:
+                raise RateLimited(scope, retry_after)
+        for _, bucket in buckets:
+            bucket.take()
+
+
+# app_commands check applying Cooldowns to a command
+def rate_limit(user: Rate, guild: Optional[Rate] = None):
+    cooldowns = Cooldowns(user, guild)
+
+    def predicate(interaction: discord.Interaction) -> bool:
+        cooldowns.hit(interaction.user.id, interaction.guild_id)
+        return True
+
+    return app_commands.check(predicate)
+
+
+# Concurrent calls with the same key share one in-flight task instead of each
+# doing the work. The task is shielded, so one caller giving up doesn't cancel
+# it for the others.
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t, k=key: self._done(k, t))
+        else:
+            metrics.coalesced_requests.inc(kind=self.name)
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # Mark retrieved even if every caller went away
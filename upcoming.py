@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import discord
+
+import metrics
+from ctftime import CTFTimeClient, parse_ctftime
+
+
+# Render one CTFtime event as an embed payload (the dict form is cheap to copy)
+def render_event_embed(event: Dict[str, Any], start_time: datetime, end_time: datetime) -> Dict[str, Any]:
+    duration = end_time - start_time
+    duration_str = f"{duration.days}d {duration.seconds//3600}h"
+
+    embed = discord.Embed(
+        title=event['title'],
+        color=random.randint(0, 0xFFFFFF)
+    )
+    embed.description = (
+        f"**Event ID:** {event['id']}\n"
+        f"**Weight:** {event['weight']}\n"
+        f"**Duration:** {duration_str}\n"
+        f"**Start Time:** {start_time.strftime('%Y-%m-%d %H:%M:%S')} UTC\n"
+        f"**End Time:** {end_time.strftime('%Y-%m-%d %H:%M:%S')} UTC\n"
+        f"**Format:** {event['format']}\n"
+        f"**[More Info]({event['url']})**"
+    )
+    if event.get('logo'):
+        embed.set_thumbnail(url=event['logo'])
+    return embed.to_dict()
+
+
+# One parsed and prerendered pull of the upcoming window; never mutated after creation
+class UpcomingSnapshot:
+    __slots__ = ("events", "embeds", "fetched_at")
+
+    def __init__(self, events: Tuple[Dict[str, Any], ...], embeds: Tuple[Dict[str, Any], ...], fetched_at: float):
+        self.events = events
+        self.embeds = embeds
+        self.fetched_at = fetched_at
+
+    # Fresh Embed objects so callers can't mutate the shared payloads
+    def build_embeds(self) -> List[discord.Embed]:
+        return [discord.Embed.from_dict(payload) for payload in self.embeds]
+
+
+# Background task that keeps the /upcoming reply ready in memory
+class UpcomingFeed:
+    def __init__(self, ctftime: CTFTimeClient, interval: float = 600.0, weeks: int = 4, limit: int = 10):
+        self.ctftime = ctftime
+        self.interval = interval
+        self.weeks = weeks
+        self.limit = limit
+        self.snapshot: Optional[UpcomingSnapshot] = None
+        self._task: Optional[asyncio.Task] = None
+        self._refresh_lock = asyncio.Lock()
+
+    async def _fetch(self) -> UpcomingSnapshot:
+        start = int(datetime.now().timestamp())
+        end = int((datetime.now() + timedelta(weeks=self.weeks)).timestamp())
+        raw = await self.ctftime.events(start, end, limit=self.limit) or []
+
+        events = []
+        embeds = []
+        for event in raw:
+            start_time = parse_ctftime(event['start'])
+            end_time = parse_ctftime(event['finish'])
+            events.append({**event, 'start_time': start_time, 'end_time': end_time})
+            embeds.append(render_event_embed(event, start_time, end_time))
+
+        # Swap in the new snapshot in one assignment so readers never see a partial one
+        self.snapshot = UpcomingSnapshot(tuple(events), tuple(embeds), time.monotonic())
+        return self.snapshot
+
+    async def refresh(self) -> UpcomingSnapshot:
+        async with self._refresh_lock:
+            return await self._fetch()
+
+    # Current snapshot, fetching inline only if nothing has been loaded yet
+    async def get(self) -> UpcomingSnapshot:
+        metrics.cache_requests.inc(cache="upcoming", result="hit" if self.snapshot else "miss")
+        if self.snapshot is None:
+            async with self._refresh_lock:
+                if self.snapshot is None:
+                    await self._fetch()
+        return self.snapshot
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logging.error(f"Error prefetching upcoming CTF events: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
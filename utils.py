@@ -1,19 +1,7 @@
-import json
-import asyncio
+from storage import get_storage
 
-file_lock = asyncio.Lock()
+# Votes live in the shared storage so bots.py and utils.py serialize against
+# the same backend instead of two independent file locks.
 
-async def load_votes(file_path="votes.json"):
-    async with file_lock:
-        try:
-            with open(file_path, "r") as file:
-                return json.load(file)
-        except FileNotFoundError:
-            return {}
-        except json.JSONDecodeError:
-            return {}
-
-async def save_votes(votes, file_path="votes.json"):
-    async with file_lock:
-        with open(file_path, "w") as file:
-            json.dump(votes, file, indent=4)
+async def load_votes():
+    return await get_storage().load_votes()